@@ -24,7 +24,6 @@ from mcp_client import (
     QueryProcessor,
     setup_logging
 )
-from anthropic import Anthropic
 
 # Set up logging
 setup_logging(debug_file='logs/mcp_debug.log')
@@ -177,6 +176,8 @@ async def main():
             signal.signal(signal.SIGINT, lambda s, f: sys.exit(0))
             signal.signal(signal.SIGTERM, lambda s, f: sys.exit(0))
     
+    # Bound up front so cleanup can tell what was actually created
+    exit_stack = server_manager = message_processor = None
     try:
         # Initialize components
         logger.info("Initializing configuration...")
@@ -185,7 +186,7 @@ async def main():
         logger.info("Setting up component managers...")
         exit_stack = AsyncExitStack()
         server_manager = ServerManager(config_manager.config, exit_stack)
-        query_processor = QueryProcessor(server_manager, Anthropic())
+        query_processor = QueryProcessor(server_manager)
         message_processor = MessageProcessor(server_manager, query_processor)
         
         # Initialize servers with timeout
@@ -215,8 +216,12 @@ async def main():
         return 1
     finally:
         logger.info("Cleaning up resources...")
-        await server_manager.cleanup_all()
-        await exit_stack.aclose()
+        if message_processor is not None:
+            await message_processor.stop_cleanup_task()
+        if server_manager is not None:
+            await server_manager.cleanup_all()
+        if exit_stack is not None:
+            await exit_stack.aclose()
         logger.info("Cleanup completed")
     return 0
 
@@ -86,16 +86,16 @@ class MCPChatInterface:
         logger.debug("Dynamic prompts initialized")
         self.needs_init = False
 
-    def load_session(self, session_identifier: str) -> bool:
+    async def load_session(self, session_identifier: str) -> bool:
         """Load an existing session by number or ID"""
-        sessions = self.session_manager.list_sessions()
+        sessions = await self.session_manager.list_sessions()
         
         # Try to load by number
         try:
             session_num = int(session_identifier)
             if 1 <= session_num <= len(sessions):
                 session_id = sessions[session_num - 1]['session_id']
-                session = self.session_manager.load_session(session_id)
+                session = await self.session_manager.load_session(session_id)
                 if session:
                     self.console.print_message({
                         'content': f"Loaded session {session_num}",
@@ -114,7 +114,7 @@ class MCPChatInterface:
                 return False
         except ValueError:
             # If not a number, try loading by ID directly
-            session = self.session_manager.load_session(session_identifier)
+            session = await self.session_manager.load_session(session_identifier)
             if session:
                 self.console.print_message({
                     'content': f"Loaded session {session_identifier}",
@@ -144,7 +144,7 @@ class MCPChatInterface:
         if role == "user":
             try:
                 # Analyze message context
-                context = analyze_message_context(content)
+                context = analyze_message_context(content, with_entities=False)
                 
                 # Get conversation context with caching
                 messages_context = self.cache_manager.get_context_with_caching(
@@ -197,10 +197,10 @@ class MCPChatInterface:
             for message in self.session_manager.current_session.messages:
                 self.console.print_message(message)
         
+        # Read input through the loop's executor so it doesn't block
+        loop = asyncio.get_running_loop()
         try:
             while True:
-                # Use asyncio.get_event_loop().run_in_executor for non-blocking input
-                loop = asyncio.get_event_loop()
                 message = await loop.run_in_executor(None, lambda: input("> "))
                 message = message.strip()
                 
@@ -268,17 +268,17 @@ class MCPChatInterface:
                         break
                     elif cmd == 'sessions':
                         limit = int(cmd_parts[1]) if len(cmd_parts) > 1 else 10
-                        sessions = self.session_manager.list_sessions(limit)
+                        sessions = await self.session_manager.list_sessions(limit)
                         self.console.print_sessions(sessions)
                     elif cmd == 'archive_sessions' and len(cmd_parts) > 1:
                         try:
                             session_numbers = [int(n) for n in cmd_parts[1].split()]
-                            sessions = self.session_manager.list_sessions()
+                            sessions = await self.session_manager.list_sessions()
                             archived = 0
                             for num in session_numbers:
                                 if 1 <= num <= len(sessions):
                                     session_id = sessions[num - 1]['session_id']
-                                    if self.session_manager.archive_session(session_id):
+                                    if await self.session_manager.archive_session(session_id):
                                         archived += 1
                             self.console.print_message({
                                 'content': f"Archived {archived} session(s)",
@@ -301,7 +301,7 @@ class MCPChatInterface:
                             })
                     elif cmd == 'load' and len(cmd_parts) > 1:
                         session_id = cmd_parts[1]
-                        if self.load_session(session_id):
+                        if await self.load_session(session_id):
                             # Set flag to reload dynamic prompts for loaded session
                             self.needs_init = True
                             await self._initialize_dynamic_prompts()
@@ -328,7 +328,7 @@ class MCPChatInterface:
                                     'timestamp': '',
                                     'metadata': {}
                                 })
-                            elif self.session_manager.remove_messages(count):
+                            elif await self.session_manager.remove_messages(count):
                                 self.console.print_message({
                                     'content': f"Removed last {count} conversation turns",
                                     'role': 'system',
@@ -355,7 +355,7 @@ class MCPChatInterface:
                     elif cmd == 'new':
                         # Save current session if it exists
                         if self.session_manager.current_session:
-                            self.session_manager.save_session()
+                            await self.session_manager.save_session()
                         
                         # Initialize new session with dynamic context
                         initial_context = {
@@ -420,4 +420,5 @@ class MCPChatInterface:
             })
         finally:
             if self.session_manager.current_session:
-                self.session_manager.save_session()
+                await self.session_manager.save_session()
+            await self.session_manager.close()
@@ -48,9 +48,13 @@ class ConsoleInterface:
             
         self.console.print("\nRecent Sessions:")
         for i, session in enumerate(sessions, 1):
-            # Parse and format the datetime
-            start_time = datetime.fromisoformat(session['start_time'])
-            formatted_time = start_time.strftime("%Y-%m-%d %H:%M")
+            # ISO timestamps already start with "YYYY-MM-DDTHH:MM", so slice
+            # instead of parsing; anything else goes through datetime
+            start_time = session['start_time']
+            if len(start_time) >= 16 and start_time[10] == 'T':
+                formatted_time = start_time[:16].replace('T', ' ')
+            else:
+                formatted_time = datetime.fromisoformat(start_time).strftime("%Y-%m-%d %H:%M")
             
             self.console.print(
                 f"[cyan]{i:2d}[/] | {formatted_time} | "
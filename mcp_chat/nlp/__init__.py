@@ -6,18 +6,24 @@ Handles message context analysis and pattern detection.
 
 from .context_analyzer import (
     analyze_message_context,
+    analyze_messages_context,
     detect_message_type,
     estimate_complexity,
     detect_phase,
     TOOL_KEYWORDS,
-    MESSAGE_TYPE_PATTERNS
+    MESSAGE_TYPE_PATTERNS,
+    PHASE_MARKERS,
+    SENSITIVE_KEYWORDS
 )
 
 __all__ = [
     'analyze_message_context',
+    'analyze_messages_context',
     'detect_message_type',
     'estimate_complexity',
     'detect_phase',
     'TOOL_KEYWORDS',
-    'MESSAGE_TYPE_PATTERNS'
+    'MESSAGE_TYPE_PATTERNS',
+    'PHASE_MARKERS',
+    'SENSITIVE_KEYWORDS'
 ]
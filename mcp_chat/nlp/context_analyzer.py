@@ -5,20 +5,40 @@ Handles natural language processing for message context analysis and pattern det
 Uses spaCy and flashtext for efficient text processing.
 """
 
+import copy
+import hashlib
 import logging
-import spacy
-from typing import Dict, Set
+import sys
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple, Union
 from flashtext import KeywordProcessor
 
+if TYPE_CHECKING:
+    import spacy
+
 logger = logging.getLogger(__name__)
 
-# Load spaCy model at module level for reuse
-try:
-    nlp = spacy.load("en_core_web_sm")
-    logger.info("Loaded spaCy model successfully")
-except OSError:
-    logger.warning("spaCy model not found. Run: python -m spacy download en_core_web_sm")
-    raise
+# spaCy model, loaded on first use so importing this module stays cheap;
+# spaCy itself is only imported at that point too
+_nlp = None
+
+def _get_nlp():
+    """Get the shared spaCy model, loading it on first call"""
+    global _nlp
+    if _nlp is None:
+        import spacy
+        try:
+            # Only POS tags, entities and sentence boundaries are used: skip
+            # the parser and lemmatizer and let the lighter senter split
+            # sentences. attribute_ruler stays on since it maps tags to POS.
+            _nlp = spacy.load("en_core_web_sm", disable=["parser", "lemmatizer"])
+            if "senter" in _nlp.disabled:
+                _nlp.enable_pipe("senter")
+            logger.info("Loaded spaCy model successfully")
+        except OSError:
+            logger.warning("spaCy model not found. Run: python -m spacy download en_core_web_sm")
+            raise
+    return _nlp
 
 # Enhanced keyword configurations
 TOOL_KEYWORDS = {
@@ -37,32 +57,82 @@ MESSAGE_TYPE_PATTERNS = {
     'task': ['create', 'make', 'add', 'setup', 'help', 'can you', 'please']
 }
 
-def detect_message_type(doc: spacy.tokens.Doc) -> str:
-    """Determine message type using spaCy doc analysis"""
-    # Initialize keyword processor
-    keyword_processor = KeywordProcessor(case_sensitive=False)
-    for msg_type, patterns in MESSAGE_TYPE_PATTERNS.items():
-        keyword_processor.add_keywords_from_list(patterns)
-    
-    # Get all matches
-    matches = set(keyword_processor.extract_keywords(doc.text))
-    
-    # Count matches for each type
-    type_counts = {}
-    for msg_type, patterns in MESSAGE_TYPE_PATTERNS.items():
-        type_counts[msg_type] = len(matches.intersection(patterns))
+SENSITIVE_KEYWORDS = ['private', 'secret', 'sensitive', 'personal', 'confidential']
+
+PHASE_MARKERS = {
+    'start': ['begin', 'start', 'initial', 'first'],
+    'middle': ['continue', 'ongoing', 'next'],
+    'end': ['finish', 'complete', 'final']
+}
+
+# Intern keyword and type strings so dict and Counter keys compare by identity
+TOOL_KEYWORDS = {
+    sys.intern(tool): [sys.intern(k) for k in keywords]
+    for tool, keywords in TOOL_KEYWORDS.items()
+}
+MESSAGE_TYPE_PATTERNS = {
+    sys.intern(msg_type): [sys.intern(p) for p in patterns]
+    for msg_type, patterns in MESSAGE_TYPE_PATTERNS.items()
+}
+
+# Message type patterns mapped to their type so extraction returns the type directly
+_MSG_TYPE_KP = KeywordProcessor(case_sensitive=False)
+_MSG_TYPE_KP.add_keywords_from_dict(MESSAGE_TYPE_PATTERNS)
+
+# Temporal markers mapped to their phase so extraction returns the phase directly
+_PHASE_KP = KeywordProcessor(case_sensitive=False)
+_PHASE_KP.add_keywords_from_dict(PHASE_MARKERS)
+
+# Every context keyword mapped to a (field, label) pair, so building a
+# context takes one scan of the message instead of one per keyword table
+_CONTEXT_KP = KeywordProcessor(case_sensitive=False)
+for _field, _table in (
+    ('message_type', MESSAGE_TYPE_PATTERNS),
+    ('interaction_phase', PHASE_MARKERS),
+    ('tools_needed', TOOL_KEYWORDS)
+):
+    for _label, _keywords in _table.items():
+        for _keyword in _keywords:
+            _CONTEXT_KP.add_keyword(_keyword, (_field, _label))
+for _keyword in SENSITIVE_KEYWORDS:
+    _CONTEXT_KP.add_keyword(_keyword, ('sensitive_data', _keyword))
+del _field, _table, _label, _keywords, _keyword
+
+# Messages below either limit skip the spaCy pipeline entirely; at this
+# length complexity rarely scores above 'low' and entities are seldom used
+_SHORT_MESSAGE_WORDS = 3
+_SHORT_MESSAGE_CHARS = 120
+
+# LRU cache of analyzed contexts; long messages are keyed by digest so the
+# text isn't held twice
+_CONTEXT_CACHE_SIZE = 256
+_CONTEXT_KEY_MAX_CHARS = 256
+_context_cache: "OrderedDict[Tuple[bool, Union[str, bytes]], Dict]" = OrderedDict()
+
+def detect_message_type(text: str) -> str:
+    """Determine message type from keyword matches in raw text"""
+    return _most_common_type(_MSG_TYPE_KP.extract_keywords(text))
+
+def _most_common_type(types: List[str]) -> str:
+    """Pick the message type matched most often"""
+    # Tally every hit against its type; repeated keywords weigh more
+    type_counts = Counter(types)
     
     # Return most frequent type, or 'task' if no matches
     if type_counts:
-        return max(type_counts.items(), key=lambda x: x[1])[0]
+        return type_counts.most_common(1)[0][0]
     return 'task'
 
-def estimate_complexity(doc: spacy.tokens.Doc) -> str:
+def estimate_complexity(doc: 'spacy.tokens.Doc') -> str:
     """Estimate message complexity based on linguistic features"""
-    # Analyze sentence structure
-    avg_tokens_per_sent = len(doc) / len(list(doc.sents))
+    from spacy.attrs import SENT_START, POS
+    
+    # Analyze sentence structure; count_by tallies attributes in Cython
+    # instead of reading them off each token in Python
+    n_sents = doc.count_by(SENT_START).get(1, 1)
+    avg_tokens_per_sent = len(doc) / n_sents
     named_entities = len(doc.ents)
-    unique_pos = len(set(token.pos_ for token in doc))
+    unique_pos = len(doc.count_by(POS))
     
     # Simple scoring system
     complexity_score = (
@@ -77,54 +147,122 @@ def estimate_complexity(doc: spacy.tokens.Doc) -> str:
         return 'medium'
     return 'low'
 
-def detect_phase(doc: spacy.tokens.Doc) -> str:
-    """Detect interaction phase based on linguistic markers"""
-    # Check for temporal markers
-    temporal_markers = {
-        'start': ['begin', 'start', 'initial', 'first'],
-        'middle': ['continue', 'ongoing', 'next'],
-        'end': ['finish', 'complete', 'final']
-    }
-    
-    text_lower = doc.text.lower()
-    for phase, markers in temporal_markers.items():
-        if any(marker in text_lower for marker in markers):
-            return phase
-            
-    return 'start'  # Default to start if no clear markers
-
-def analyze_message_context(message: str) -> Dict:
+def detect_phase(text: str) -> str:
+    """Detect interaction phase from temporal markers in raw text"""
+    # Single trie pass; the first marker found determines the phase
+    phases = _PHASE_KP.extract_keywords(text)
+    return phases[0] if phases else 'start'  # Default to start if no clear markers
+
+def _context_cache_key(message: str, with_entities: bool) -> Tuple[bool, Union[str, bytes]]:
+    """Get the context cache key for a message"""
+    if len(message) <= _CONTEXT_KEY_MAX_CHARS:
+        return with_entities, message
+    return with_entities, hashlib.blake2b(message.encode(), digest_size=16).digest()
+
+def analyze_message_context(message: str, with_entities: bool = True) -> Dict:
     """Analyze message to determine context for prompt selection using NLP
     
     Args:
         message: The user's message
+        with_entities: Whether to run named entity recognition; when False
+            'entities' is always empty and the NER pipe is skipped
         
     Returns:
         Dictionary containing enhanced context information
     """
-    # Process message with spaCy
-    doc = nlp(message)
-    
-    # Initialize keyword processor for tools
-    tool_processor = KeywordProcessor(case_sensitive=False)
-    for tool, keywords in TOOL_KEYWORDS.items():
-        tool_processor.add_keywords_from_dict({tool: keywords})
+    key = _context_cache_key(message, with_entities)
+    cached = _context_cache.get(key)
+    if cached is not None:
+        _context_cache.move_to_end(key)
+        return copy.deepcopy(cached)
+
+    if _is_short_message(message):
+        context = _keyword_context(message)
+    else:
+        doc = _get_nlp()(message, disable=_disabled_pipes(with_entities))
+        context = _context_from_doc(message, doc)
+    _cache_context(key, context)
+    return copy.deepcopy(context)
+
+def analyze_messages_context(messages: List[str], with_entities: bool = True) -> List[Dict]:
+    """Analyze several messages at once, batching them through spaCy
     
-    # Build enhanced context
-    context = {
-        'message_type': detect_message_type(doc),
-        'interaction_phase': detect_phase(doc),
-        'complexity': estimate_complexity(doc),
-        'tools_needed': list(set(tool_processor.extract_keywords(message))),
-        'entities': [{'text': ent.text, 'label': ent.label_} for ent in doc.ents],
-        'sentiment': doc.sentiment
+    Args:
+        messages: The messages to analyze
+        with_entities: Whether to run named entity recognition
+        
+    Returns:
+        One context dictionary per message, in the same order
+    """
+    results: List[Optional[Dict]] = [None] * len(messages)
+    pending = []
+    for i, message in enumerate(messages):
+        key = _context_cache_key(message, with_entities)
+        cached = _context_cache.get(key)
+        if cached is not None:
+            _context_cache.move_to_end(key)
+            results[i] = copy.deepcopy(cached)
+        elif _is_short_message(message):
+            context = _keyword_context(message)
+            _cache_context(key, context)
+            results[i] = copy.deepcopy(context)
+        else:
+            pending.append((i, key, message))
+
+    if pending:
+        docs = _get_nlp().pipe(
+            [message for _, _, message in pending],
+            batch_size=64,
+            disable=_disabled_pipes(with_entities)
+        )
+        for (i, key, message), doc in zip(pending, docs):
+            context = _context_from_doc(message, doc)
+            _cache_context(key, context)
+            results[i] = copy.deepcopy(context)
+    return results
+
+def _disabled_pipes(with_entities: bool) -> List[str]:
+    """Get the pipes to skip for a request; the tagger and sentence
+    boundaries are always kept since complexity scoring needs them"""
+    return [] if with_entities else ['ner']
+
+def _cache_context(key: Tuple[bool, Union[str, bytes]], context: Dict):
+    """Store an analyzed context, evicting the least recently used"""
+    _context_cache[key] = context
+    if len(_context_cache) > _CONTEXT_CACHE_SIZE:
+        _context_cache.popitem(last=False)
+
+def _is_short_message(message: str) -> bool:
+    """Check whether a message is short enough to skip spaCy"""
+    return len(message) < _SHORT_MESSAGE_CHARS or len(message.split()) < _SHORT_MESSAGE_WORDS
+
+def _scan_keywords(message: str) -> Dict:
+    """Fill the keyword-driven context fields from a single message scan"""
+    hits = {'message_type': [], 'interaction_phase': [], 'tools_needed': [], 'sensitive_data': []}
+    for field, label in _CONTEXT_KP.extract_keywords(message):
+        hits[field].append(label)
+    phases = hits['interaction_phase']
+    return {
+        'message_type': _most_common_type(hits['message_type']),
+        'interaction_phase': phases[0] if phases else 'start',
+        'tools_needed': list(set(hits['tools_needed'])),
+        'sensitive_data': bool(hits['sensitive_data'])
     }
-    
-    # Detect sensitive data handling
-    sensitive_processor = KeywordProcessor(case_sensitive=False)
-    sensitive_keywords = ['private', 'secret', 'sensitive', 'personal', 'confidential']
-    sensitive_processor.add_keywords_from_list(sensitive_keywords)
-    context['sensitive_data'] = bool(sensitive_processor.extract_keywords(message))
-    
-    logger.debug(f"Analyzed context: {context}")
+
+def _keyword_context(message: str) -> Dict:
+    """Build context from keyword matches alone"""
+    # Short messages carry little linguistic signal, so answer them from
+    # keyword matches alone
+    context = _scan_keywords(message)
+    context['complexity'] = 'low'
+    context['entities'] = []
+    logger.debug("Analyzed short message context: %s", context)
+    return context
+
+def _context_from_doc(message: str, doc: 'spacy.tokens.Doc') -> Dict:
+    """Build context from keyword matches and a processed spaCy doc"""
+    context = _scan_keywords(message)
+    context['complexity'] = estimate_complexity(doc)
+    context['entities'] = [{'text': ent.text, 'label': ent.label_} for ent in doc.ents]
+    logger.debug("Analyzed context: %s", context)
     return context
@@ -19,31 +19,35 @@ class MessageProcessor:
     async def process_response(self, response: str):
         """Process and record assistant response with metadata"""
         # Parse response sections
-        sections = response.split('\n')
+        sections = {}
+        tool_calls = []
         current_section = None
-        metadata = {
-            'sections': {},
-            'tool_calls': []
-        }
+        current_lines = None
         
-        for line in sections:
+        for line in response.split('\n'):
             if line.startswith('[') and line.endswith(']'):
                 current_section = line[1:-1]
-                metadata['sections'][current_section] = []
+                # Bind the section's list once instead of looking it up per line
+                sections[current_section] = current_lines = []
             elif current_section and line.strip():
-                metadata['sections'][current_section].append(line.strip())
+                current_lines.append(line.strip())
                 
                 # Track tool usage
                 if current_section == 'Tool Call':
                     if line.startswith('Tool:'):
-                        metadata['tool_calls'].append({
+                        tool_calls.append({
                             'tool': line.split(':', 1)[1].strip(),
                             'success': True  # Will be updated when result is processed
                         })
                 elif current_section == 'Error':
-                    if metadata['tool_calls']:
-                        metadata['tool_calls'][-1]['success'] = False
-                        metadata['tool_calls'][-1]['error'] = line
+                    if tool_calls:
+                        tool_calls[-1]['success'] = False
+                        tool_calls[-1]['error'] = line
+        
+        metadata = {
+            'sections': sections,
+            'tool_calls': tool_calls
+        }
         
         # Add response to conversation with caching for long responses
         self.conversation_manager.add_message(
@@ -73,7 +77,7 @@ class MessageProcessor:
                 'cache_control': template.cache_control
             }
             self.conversation_manager.current_session.system_prompts.append(system_prompt)
-            self.conversation_manager.save_session()
+            await self.conversation_manager.save_session()
             return True
         return False
 
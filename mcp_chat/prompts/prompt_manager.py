@@ -4,18 +4,39 @@ Prompt Manager Module
 Manages system prompts, templates, and dynamic prompt generation.
 """
 
-import json
+import functools
 import os
+import re
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional
-from datetime import datetime
 import time
+from collections import defaultdict
+
+import orjson
+
 from .scratch_pad import ScratchPadManager
+from ..utils.file_utils import atomic_write
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Context used to select the system prompts for a new session
+DEFAULT_PROMPT_CONTEXT = {
+    'message_type': 'task',
+    'interaction_phase': 'start',
+    'sensitive_data': True
+}
+
+# Templates added for each message type and interaction phase
+MESSAGE_TYPE_PROMPTS = {
+    'reflection': ('memory_management',),
+    'insight': ('memory_management',),
+}
+PHASE_PROMPTS = {
+    'start': ('session_structure',),
+}
+
+@dataclass(slots=True)
 class PromptTemplate:
     """Represents a system prompt template"""
     name: str
@@ -24,6 +45,26 @@ class PromptTemplate:
     variables: List[str]
     tags: List[str]
     cache_control: bool = False
+    # Content split around {{variable}} placeholders: literals at even
+    # indices, variable names at odd indices
+    _segments: List[str] = field(init=False, repr=False, compare=False)
+    # Whether rendering needs the current system datetime
+    _needs_datetime: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._segments = _split_template(self)
+        self._needs_datetime = 'datetime' in self.variables
+
+def _copy_prompt(prompt: Dict) -> Dict:
+    """Copy a rendered prompt, including its cache_control dict"""
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in prompt.items()}
+
+def _split_template(template: PromptTemplate) -> List[str]:
+    """Split template content into literal chunks and variable names"""
+    if not template.variables:
+        return [template.content]
+    pattern = r'\{\{(' + '|'.join(map(re.escape, template.variables)) + r')\}\}'
+    return re.split(pattern, template.content)
 
 class SystemPromptManager:
     """Manages system prompts and templates"""
@@ -31,13 +72,23 @@ class SystemPromptManager:
     def __init__(self, config: dict, exit_stack, prompts_dir: str = 'chat_history/prompts'):
         self.prompts_dir = prompts_dir
         self.templates: Dict[str, PromptTemplate] = {}
+        self._tag_index: Dict[str, List[PromptTemplate]] = defaultdict(list)
+        self._default_prompts: Optional[List[Dict]] = None
+        # Rendered prompts for templates without variables; only copies
+        # of these leave the manager
+        self._static_prompts: Dict[str, Dict] = {}
+        # Rendered prompts keyed by (template name, sorted variable items);
+        # cleared whenever a template is (re)registered
+        self._render = functools.lru_cache(maxsize=256)(self._render_template)
         self.scratch_pad = ScratchPadManager(config, exit_stack)
         self._ensure_directories()
         self._load_templates()
         if not self.templates:
             logger.debug("No templates loaded, initializing defaults")
             for template in create_default_templates():
-                self.add_template(template)
+                self.add_template(template, save=False)
+            self.save_templates()
+        self._default_prompts = self._select_context_prompts(DEFAULT_PROMPT_CONTEXT)
 
     def _ensure_directories(self):
         """Ensure required directories exist"""
@@ -46,22 +97,23 @@ class SystemPromptManager:
     def _load_templates(self):
         """Load prompt templates from disk"""
         template_file = os.path.join(self.prompts_dir, 'templates.json')
-        logger.debug(f"Loading templates from {template_file}")
-        if os.path.exists(template_file):
-            with open(template_file, 'r') as f:
-                data = json.load(f)
-                for template_data in data:
-                    template = PromptTemplate(
-                        name=template_data['name'],
-                        content=template_data['content'],
-                        description=template_data['description'],
-                        variables=template_data['variables'],
-                        tags=template_data['tags']
-                    )
-                    self.templates[template.name] = template
-                    logger.debug(f"Loaded template: {template.name} with tags: {template.tags}")
-        else:
+        logger.debug("Loading templates from %s", template_file)
+        try:
+            with open(template_file, 'rb') as f:
+                data = orjson.loads(f.read())
+        except FileNotFoundError:
             logger.debug("No templates.json found, will create default templates")
+            return
+        for template_data in data:
+            template = PromptTemplate(
+                name=template_data['name'],
+                content=template_data['content'],
+                description=template_data['description'],
+                variables=template_data['variables'],
+                tags=template_data['tags']
+            )
+            self._register_template(template)
+            logger.debug("Loaded template: %s with tags: %s", template.name, template.tags)
 
     def save_templates(self):
         """Save prompt templates to disk"""
@@ -76,13 +128,30 @@ class SystemPromptManager:
             }
             for t in self.templates.values()
         ]
-        with open(template_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        atomic_write(template_file, orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
-    def add_template(self, template: PromptTemplate):
-        """Add a new prompt template"""
+    def _register_template(self, template: PromptTemplate):
+        """Store a template and keep the tag index in sync"""
+        previous = self.templates.get(template.name)
+        if previous is not None:
+            for tag in dict.fromkeys(previous.tags):
+                self._tag_index[tag].remove(previous)
+        self._render.cache_clear()
+        self._static_prompts.pop(template.name, None)
         self.templates[template.name] = template
-        self.save_templates()
+        for tag in dict.fromkeys(template.tags):
+            self._tag_index[tag].append(template)
+
+    def add_template(self, template: PromptTemplate, save: bool = True):
+        """Add a new prompt template
+
+        Pass save=False when adding several templates in a row and call
+        save_templates() once afterwards.
+        """
+        self._register_template(template)
+        self._default_prompts = None
+        if save:
+            self.save_templates()
 
     def get_template(self, name: str) -> Optional[PromptTemplate]:
         """Get a prompt template by name"""
@@ -91,7 +160,7 @@ class SystemPromptManager:
     def list_templates(self, tag: str = None) -> List[PromptTemplate]:
         """List available templates, optionally filtered by tag"""
         if tag:
-            return [t for t in self.templates.values() if tag in t.tags]
+            return list(self._tag_index.get(tag, ()))
         return list(self.templates.values())
 
     def generate_prompt(self, template_name: str, variables: Dict[str, str] = None) -> Optional[Dict]:
@@ -100,17 +169,46 @@ class SystemPromptManager:
         if not template:
             return None
 
-        # Initialize variables dict if None
-        variables = variables or {}
+        # Copy rather than mutate the caller's dict, since the injected
+        # datetime is part of the render cache key
+        variables = dict(variables) if variables else {}
         
         # Add system datetime if needed
-        if 'datetime' in template.variables and 'datetime' not in variables:
+        if template._needs_datetime and 'datetime' not in variables:
             variables['datetime'] = get_system_datetime()
 
-        prompt = template.content
-        for var in template.variables:
-            if var in variables:
-                prompt = prompt.replace(f"{{{{{var}}}}}", variables[var])
+        # Copy so callers can't modify the cached prompt
+        return _copy_prompt(self._render(template_name, tuple(sorted(variables.items()))))
+
+    def _static_prompt(self, template_name: str) -> Optional[Dict]:
+        """Get a variable-free prompt rendered once and reused
+        
+        The returned dict is the cached one; copy it before handing it out.
+        """
+        prompt = self._static_prompts.get(template_name)
+        if prompt is None:
+            template = self.get_template(template_name)
+            if not template or template.variables:
+                return self.generate_prompt(template_name, {})
+            prompt = self._render_template(template_name, ())
+            self._static_prompts[template_name] = prompt
+        return prompt
+
+    def _render_template(self, template_name: str, items: tuple) -> Dict:
+        """Render a template with the given variable items"""
+        template = self.templates[template_name]
+        segments = template._segments
+        
+        if len(segments) == 1:
+            # No placeholders, so the content is the prompt
+            prompt = segments[0]
+        else:
+            # Substitute variables by joining the pre-split segments
+            variables = dict(items)
+            prompt = ''.join(
+                variables.get(segment, f"{{{{{segment}}}}}") if i % 2 else segment
+                for i, segment in enumerate(segments)
+            )
 
         result = {
             "type": "text",
@@ -124,15 +222,17 @@ class SystemPromptManager:
 
     async def get_prompts_by_context(self, context: Dict) -> List[Dict]:
         """Get system prompts based on conversation context"""
-        logger.debug(f"Getting prompts for context: {json.dumps(context, indent=2)}")
+        logger.debug("Getting prompts for context: %s", context)
+        return await self._assemble_prompts(self._select_context_prompts(context))
+
+    async def _assemble_prompts(self, context_prompts: List[Dict]) -> List[Dict]:
+        """Combine core prompts and scratch pad content with context-specific prompts"""
         selected_prompts = []
         
         # Always include core personality prompt
-        logger.debug("Attempting to add core personality prompt")
-        personality = self.generate_prompt('coach_personality', {})
+        personality = self._static_prompt('coach_personality')
         if personality:
-            logger.debug("Added core personality prompt")
-            selected_prompts.append(personality)
+            selected_prompts.append(_copy_prompt(personality))
         else:
             logger.warning("Failed to generate core personality prompt")
 
@@ -146,52 +246,52 @@ class SystemPromptManager:
             }
             selected_prompts.append(scratch)
 
-        # Add context-specific prompts
-        message_type = context.get('message_type', '')
-        logger.debug(f"Processing message type: {message_type}")
-        
-        # Add memory management for reflection or insight messages
-        if message_type in ['reflection', 'insight']:
-            logger.debug(f"{message_type} message type - adding memory management prompt")
-            memory = self.generate_prompt('memory_management', {})
-            if memory:
-                selected_prompts.append(memory)
-                logger.debug("Added memory management prompt")
-                
-        # Add session structure based on interaction phase
-        phase = context.get('interaction_phase', '')
-        logger.debug(f"Processing interaction phase: {phase}")
-        if phase == 'start':
-            logger.debug("Start phase - adding session structure prompt")
-            structure = self.generate_prompt('session_structure', {})
-            if structure:
-                selected_prompts.append(structure)
-                logger.debug("Added session structure prompt")
-                
-        # Add privacy prompt when handling sensitive data
+        # Hand out copies so callers can't modify the cached prompts
+        selected_prompts.extend(_copy_prompt(p) for p in context_prompts)
+        logger.debug("Selected %d prompts total", len(selected_prompts))
+        return selected_prompts
+
+    def _select_context_prompts(self, context: Dict) -> List[Dict]:
+        """Select the template prompts that depend on conversation context"""
+        names = (
+            MESSAGE_TYPE_PROMPTS.get(context.get('message_type', ''), ())
+            + PHASE_PROMPTS.get(context.get('interaction_phase', ''), ())
+        )
         if context.get('sensitive_data', False):
-            logger.debug("Sensitive data detected - adding privacy prompt")
-            privacy = self.generate_prompt('privacy', {})
-            if privacy:
-                selected_prompts.append(privacy)
-                logger.debug("Added privacy prompt")
-        
-        logger.debug(f"Selected {len(selected_prompts)} prompts total")
+            names += ('privacy',)
+
+        selected_prompts = []
+        for name in names:
+            prompt = self._static_prompt(name)
+            if prompt:
+                selected_prompts.append(prompt)
         return selected_prompts
 
     async def get_default_prompts(self) -> List[Dict]:
         """Get default system prompts for new sessions"""
-        return await self.get_prompts_by_context({
-            'message_type': 'task',
-            'interaction_phase': 'start',
-            'sensitive_data': True
-        })
+        if self._default_prompts is None:
+            self._default_prompts = self._select_context_prompts(DEFAULT_PROMPT_CONTEXT)
+        return await self._assemble_prompts(self._default_prompts)
+
+# Last formatted datetime as [epoch second, formatted string]
+_datetime_cache = [-1, '']
 
 def get_system_datetime() -> str:
-    """Get current date and time in system timezone"""
-    current_time = datetime.now()
-    timezone = time.tzname[time.daylight if time.daylight and time.localtime().tm_isdst else 0]
-    return f"{current_time.strftime('%Y-%m-%d %H:%M:%S')} {timezone}"
+    """Get current date and time in system timezone
+
+    The formatted value only changes once per second, so it is cached
+    until the wall clock moves to the next second.
+    """
+    now = time.time()
+    second = int(now)
+    if second != _datetime_cache[0]:
+        # Format from the same timestamp the cache is keyed on, so the
+        # string can't belong to a neighbouring second
+        local = time.localtime(now)
+        timezone = time.tzname[local.tm_isdst > 0]
+        _datetime_cache[0] = second
+        _datetime_cache[1] = f"{time.strftime('%Y-%m-%d %H:%M:%S', local)} {timezone}"
+    return _datetime_cache[1]
 
 def create_default_templates() -> List[PromptTemplate]:
     """Create default system prompt templates"""
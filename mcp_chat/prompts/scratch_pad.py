@@ -9,46 +9,77 @@ import os
 from datetime import datetime
 from typing import Optional
 
+import aiofiles
+
+from ..utils.file_utils import async_atomic_write
+
 logger = logging.getLogger(__name__)
 
+# Placeholder written to a fresh scratch pad
+EMPTY_CONTENT = "No context available yet."
+
+# Scratch pad file, in the data directory at the project root
+SCRATCH_PAD_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'scratch-pad.txt')
+
 class ScratchPadManager:
     """Manages dynamic context information through file operations"""
 
     def __init__(self, config: dict, exit_stack):
         """Initialize the scratch pad manager"""
-        self.file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'scratch-pad.txt')
+        self.file_path = SCRATCH_PAD_PATH
         self._cached_content: Optional[str] = None
+        self._cached_mtime: Optional[float] = None
         self._ensure_file_exists()
+        
+        # Prime the cache so steady-state reads never touch the file
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                self._cached_content = f.read()
+            self._cached_mtime = os.stat(self.file_path).st_mtime
+        except OSError as e:
+            logger.error(f"Failed to read scratch pad content: {e}")
 
     def _ensure_file_exists(self):
-        """Ensure the scratch pad file exists"""
+        """Ensure the scratch pad file exists
+        
+        Runs once from __init__, which can't await, so this stays synchronous.
+        """
         os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
         if not os.path.exists(self.file_path):
             with open(self.file_path, 'w', encoding='utf-8') as f:
-                f.write("No context available yet.")
+                f.write(EMPTY_CONTENT)
 
     async def _get_content(self) -> str:
-        """Get content from file"""
+        """Get content from cache, re-reading the file only if it changed on disk"""
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                self._cached_content = content
-                return content
+            mtime = os.stat(self.file_path).st_mtime
+            if self._cached_content is not None and mtime == self._cached_mtime:
+                return self._cached_content
+            
+            async with aiofiles.open(self.file_path, 'r', encoding='utf-8') as f:
+                content = await f.read()
+            self._cached_content = content
+            self._cached_mtime = mtime
+            return content
         except Exception as e:
             logger.error(f"Failed to get scratch pad content: {e}")
-            return self._cached_content if self._cached_content else "No context available yet."
+            return self._cached_content if self._cached_content else EMPTY_CONTENT
 
     async def _update_content(self, content: str):
         """Update content in file"""
         try:
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            self._cached_content = content
+            await async_atomic_write(self.file_path, content)
+            self._cache_written(content)
             logger.debug("Updated scratch pad content")
         except Exception as e:
             logger.error(f"Failed to update scratch pad content: {e}")
             raise
 
+    def _cache_written(self, content: str):
+        """Cache content once it's on disk, keyed by the file's new mtime"""
+        self._cached_mtime = os.stat(self.file_path).st_mtime
+        self._cached_content = content
+
     async def update_content(self, content: str):
         """Update scratch pad content"""
         await self._update_content(content)
@@ -56,12 +87,25 @@ class ScratchPadManager:
     async def append_content(self, new_content: str):
         """Append new content to scratch pad"""
         current_content = await self._get_content()
-        if current_content == "No context available yet.":
-            current_content = ""
-            
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         entry = f"\n[{timestamp}] {new_content}"
-        await self._update_content(current_content + entry)
+        
+        # The placeholder has to be replaced, so that case takes a full rewrite
+        if current_content == EMPTY_CONTENT:
+            await self._update_content(entry)
+            return
+        
+        # Otherwise write only the new entry
+        try:
+            async with aiofiles.open(self.file_path, 'a', encoding='utf-8') as f:
+                await f.write(entry)
+            self._cache_written(current_content + entry)
+            logger.debug("Appended to scratch pad content")
+        except Exception as e:
+            logger.error(f"Failed to append scratch pad content: {e}")
+            # Part of the entry may have landed, so re-read on the next get
+            self._cached_mtime = None
+            raise
 
     async def clear_content(self):
         """Clear scratch pad content"""
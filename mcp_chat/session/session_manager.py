@@ -4,19 +4,174 @@ Session Manager Module
 Handles conversation session management, persistence, and session-related operations.
 """
 
+import asyncio
+import atexit
+import hashlib
 import json
+import mmap
 import os
 import logging
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 import uuid
+import weakref
+
+import aiofiles
+import aiofiles.os
+import orjson
 
 from ..prompts.prompt_manager import SystemPromptManager
+from ..utils.file_utils import atomic_write, async_atomic_write
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Number of parsed sessions kept in memory by SessionManager
+SESSION_CACHE_SIZE = 32
+
+# Seconds between background flushes of pending session writes
+FLUSH_INTERVAL = 0.5
+
+# Initial effectiveness stats for a system prompt; copied on first use
+_DEFAULT_STATS = {
+    'uses': 0,
+    'successful_interactions': 0,
+    'tool_success_rate': 0.0,
+    'cache_hit_rate': 0.0
+}
+
+# Files at least this large are memory-mapped rather than read into a bytes
+# copy during the index rebuild
+MMAP_THRESHOLD = 64 * 1024
+
+# Sidecar file in the sessions directory holding one summary per session
+INDEX_FILENAME = '_index.json'
+
+def _deep_merge(target: Dict, updates: Dict) -> Dict:
+    """Merge updates into target in place, descending into nested dictionaries"""
+    stack = deque([(target, updates)])
+    while stack:
+        dst, src = stack.pop()
+        for k, v in src.items():
+            if isinstance(v, dict) and isinstance(dst.get(k), dict):
+                stack.append((dst[k], v))
+            else:
+                dst[k] = v
+    return target
+
+def _prompt_id(text: str) -> str:
+    """Get the short id prompt effectiveness stats are keyed by"""
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+def _read_json_file(path: str):
+    """Parse a JSON file, memory-mapping it when it's large"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return orjson.loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return orjson.loads(view)
+
+def _parse_log_lines(lines: List[bytes]) -> Tuple[List[Dict], bool]:
+    """Parse JSONL records, dropping a torn last line
+    
+    Returns the records and whether a torn line was dropped. Only the last
+    line can be cut short by an interrupted append, so a bad line anywhere
+    else still raises.
+    """
+    lines = [line for line in lines if line.strip()]
+    records = [orjson.loads(line) for line in lines[:-1]]
+    if lines:
+        try:
+            records.append(orjson.loads(lines[-1]))
+        except orjson.JSONDecodeError:
+            logger.warning("Dropping incomplete last record from session log")
+            return records, True
+    return records, False
+
+def _summarize_message_log(path: str) -> Tuple[int, Optional[Dict], Optional[Dict]]:
+    """Get the message count and first and last messages from a JSONL log
+    
+    Only the first and last lines are parsed; large logs are memory-mapped
+    and scanned for newlines without copying them. A torn last line isn't
+    counted.
+    """
+    if not os.path.exists(path):
+        return 0, None, None
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return 0, None, None
+        if size < MMAP_THRESHOLD:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+            try:
+                last = orjson.loads(lines[-1]) if lines else None
+            except orjson.JSONDecodeError:
+                logger.warning(f"Dropping incomplete last record from {path}")
+                lines.pop()
+                last = orjson.loads(lines[-1]) if lines else None
+            if not lines:
+                return 0, None, None
+            return len(lines), orjson.loads(lines[0]), last
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Every record ends in a newline except possibly a torn last write
+            end = size - 1 if mm[size - 1:] == b"\n" else size
+            count = 0 if end < size else 1
+            pos = mm.find(b"\n")
+            while pos != -1:
+                count += 1
+                pos = mm.find(b"\n", pos + 1)
+            start = mm.rfind(b"\n", 0, end) + 1
+            try:
+                last = orjson.loads(mm[start:end])
+            except orjson.JSONDecodeError:
+                logger.warning(f"Dropping incomplete last record from {path}")
+                count -= 1
+                if not count:
+                    return 0, None, None
+                end = start - 1
+                start = mm.rfind(b"\n", 0, end) + 1
+                last = orjson.loads(mm[start:end])
+            first_end = mm.find(b"\n")
+            first = orjson.loads(mm[:first_end if first_end != -1 else size])
+            return count, first, last
+
+def _reset_cache_blocks(metadata: Dict):
+    """Mark cache blocks from a previous load as cleaned"""
+    # Initialize cache block tracking if not present
+    if 'cache_blocks' not in metadata:
+        metadata['cache_blocks'] = {
+            'active': 0,
+            'cleaned': 0,
+            'total_created': 0
+        }
+    
+    # Clear any existing cache blocks from previous load
+    cleaned = metadata['cache_blocks'].get('active', 0)
+    metadata['cache_blocks'].update({
+        'active': 0,
+        'cleaned': metadata['cache_blocks'].get('cleaned', 0) + cleaned
+    })
+
+def _session_summary(session_id: str, start_time: str, last_active: str, first_message: Optional[Dict],
+                     message_count: int, tool_usage_count: int) -> Dict:
+    """Build the list_sessions summary for a session"""
+    # Get first message content for context
+    first_msg = first_message['content'] if first_message else ''
+    first_msg_text = first_msg.get('text', '') if isinstance(first_msg, dict) else str(first_msg)
+    # Truncate to first 50 chars
+    first_msg_preview = first_msg_text[:50] + ('...' if len(first_msg_text) > 50 else '')
+    
+    return {
+        'session_id': session_id,
+        'start_time': start_time,
+        'last_active': last_active,
+        'message_count': message_count,
+        'tool_usage_count': tool_usage_count,
+        'first_message': first_msg_preview
+    }
+
+@dataclass(slots=True)
 class ToolUsage:
     """Tracks tool usage within a conversation"""
     tool_name: str
@@ -25,7 +180,7 @@ class ToolUsage:
     context: Dict
     result: str
 
-@dataclass
+@dataclass(slots=True)
 class ConversationSession:
     """Represents a single conversation session"""
     session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
@@ -41,18 +196,20 @@ class ConversationSession:
         """Get the current context from metadata"""
         return self.metadata.get('current_context', {})
 
-    def to_dict(self) -> Dict:
-        """Convert session to dictionary for serialization"""
-        return {
+    def to_dict(self, include_messages: bool = True) -> Dict:
+        """Convert session to dictionary for serialization
+        
+        Datetimes are left as-is; orjson writes them as ISO 8601 strings.
+        """
+        data = {
             'session_id': self.session_id,
-            'start_time': self.start_time.isoformat(),
-            'last_active': self.last_active.isoformat(),
-            'messages': self.messages,
+            'start_time': self.start_time,
+            'last_active': self.last_active,
             'metadata': self.metadata,
             'tool_usage': [
                 {
                     'tool_name': t.tool_name,
-                    'timestamp': t.timestamp.isoformat(),
+                    'timestamp': t.timestamp,
                     'success': t.success,
                     'context': t.context,
                     'result': t.result
@@ -61,6 +218,9 @@ class ConversationSession:
             ],
             'system_prompts': self.system_prompts
         }
+        if include_messages:
+            data['messages'] = self.messages
+        return data
 
     @classmethod
     def from_dict(cls, data: Dict) -> 'ConversationSession':
@@ -68,15 +228,17 @@ class ConversationSession:
         # Initialize metadata with defaults for backward compatibility
         metadata = data.get('metadata', {})
         if 'prompt_effectiveness' not in metadata and 'system_prompts' in data:
-            metadata['prompt_effectiveness'] = {
-                prompt['text']: {
-                    'uses': 0,
-                    'successful_interactions': 0,
-                    'tool_success_rate': 0.0,
-                    'cache_hit_rate': 0.0
-                }
-                for prompt in data['system_prompts']
+            texts = [
+                prompt['text'] for prompt in data['system_prompts']
                 if isinstance(prompt, dict) and 'text' in prompt
+            ]
+            metadata['prompt_id_map'] = {_prompt_id(text): text for text in texts}
+            metadata['prompt_effectiveness'] = {pid: _DEFAULT_STATS.copy() for pid in metadata['prompt_id_map']}
+        elif 'prompt_effectiveness' in metadata and 'prompt_id_map' not in metadata:
+            # Older sessions key stats by the full prompt text
+            metadata['prompt_id_map'] = {_prompt_id(text): text for text in metadata['prompt_effectiveness']}
+            metadata['prompt_effectiveness'] = {
+                _prompt_id(text): stats for text, stats in metadata['prompt_effectiveness'].items()
             }
         
         session = cls(
@@ -99,6 +261,19 @@ class ConversationSession:
         ]
         return session
 
+# Managers that haven't been closed; flushed once at interpreter exit
+_open_managers: "weakref.WeakSet[SessionManager]" = weakref.WeakSet()
+
+def _flush_open_managers():
+    """Persist deferred changes of managers that were never closed"""
+    for manager in list(_open_managers):
+        try:
+            manager._flush_sync()
+        except Exception as e:
+            logger.error(f"Failed to flush session at exit: {e}")
+
+atexit.register(_flush_open_managers)
+
 class SessionManager:
     """Manages conversation sessions and their persistence"""
     
@@ -107,18 +282,84 @@ class SessionManager:
         self.sessions_dir = os.path.join(storage_dir, 'sessions')
         self.archive_dir = os.path.join(storage_dir, 'archived_sessions')
         self.current_session: Optional[ConversationSession] = None
+        # Number of current session messages already written to its JSONL log
+        self._persisted_messages = 0
+        self._header_saved = False
+        self._index_path = os.path.join(self.sessions_dir, INDEX_FILENAME)
+        # Ids of the current session's system prompts, refreshed when the
+        # prompt list grows or shrinks
+        self._prompt_keys: List[str] = []
+        self._prompt_keys_len = -1
+        # Write-behind state: add_message marks the session dirty and a
+        # background task persists it
+        self._dirty = False
+        self._header_dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        # Background write batches from start_session, kept until they finish
+        self._write_tasks: Set[asyncio.Task] = set()
+        # Prompt effectiveness updates not yet folded into session metadata
+        self._stats_delta: Dict[str, Dict] = {}
+        self._write_lock = asyncio.Lock()
+        # Async write batches started but not yet finished
+        self._writes_in_flight = 0
+        _open_managers.add(self)
+        # Parsed sessions by ID, least recently loaded first
+        self._session_cache: "OrderedDict[str, ConversationSession]" = OrderedDict()
         self._ensure_directories()
+        self._index: Dict[str, Dict] = self._load_index()
 
     def _ensure_directories(self):
         """Ensure required directories exist"""
         os.makedirs(self.sessions_dir, exist_ok=True)
         os.makedirs(self.archive_dir, exist_ok=True)
 
+    def _header_path(self, session_id: str) -> str:
+        """Get the path of a session's header file"""
+        return os.path.join(self.sessions_dir, f"{session_id}.json")
+
+    def _messages_path(self, session_id: str) -> str:
+        """Get the path of a session's append-only message log"""
+        return os.path.join(self.sessions_dir, f"{session_id}.messages.jsonl")
+
+    def _current_prompt_keys(self) -> List[str]:
+        """Get the ids of the current session's system prompts"""
+        prompts = self.current_session.system_prompts
+        if len(prompts) != self._prompt_keys_len:
+            id_map = self.current_session.metadata.setdefault('prompt_id_map', {})
+            self._prompt_keys = []
+            for prompt in prompts:
+                if 'text' in prompt:
+                    pid = _prompt_id(prompt['text'])
+                    if pid not in id_map:
+                        id_map[pid] = prompt['text']
+                        self._header_dirty = True
+                    self._prompt_keys.append(pid)
+            self._prompt_keys_len = len(prompts)
+        return self._prompt_keys
+
+    async def _read_messages(self, session_id: str) -> Tuple[List[Dict], bool]:
+        """Read a session's messages from its JSONL log
+        
+        Returns the messages and whether a torn last line was dropped.
+        """
+        messages_file = self._messages_path(session_id)
+        if not await aiofiles.os.path.exists(messages_file):
+            return [], False
+        async with aiofiles.open(messages_file, 'rb') as f:
+            data = await f.read()
+        return _parse_log_lines(data.splitlines())
+
     def start_session(self, initial_context: Dict = None, system_prompts: List[Dict] = None) -> ConversationSession:
         """Start a new conversation session with context and system prompts"""
         logger.debug("Starting new session")
-        logger.debug(f"Initial context: {json.dumps(initial_context, indent=2) if initial_context else 'None'}")
-        logger.debug(f"System prompts: {json.dumps(system_prompts, indent=2) if system_prompts else 'None'}")
+        # Writes for the outgoing session are collected now and applied in
+        # the background, since this stays synchronous for the constructor
+        self.flush_stats()
+        if self._dirty and self.current_session:
+            self._run_writes(self._collect_writes(self._header_dirty or not self._header_saved), self.current_session)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Initial context: %s", json.dumps(initial_context, indent=2) if initial_context else 'None')
+            logger.debug("System prompts: %s", json.dumps(system_prompts, indent=2) if system_prompts else 'None')
         
         context = initial_context or {
             'message_type': 'task',
@@ -131,12 +372,11 @@ class SessionManager:
             system_prompts=system_prompts or [],
             metadata={
                 'prompt_effectiveness': {
-                    prompt['text']: {
-                        'uses': 0,
-                        'successful_interactions': 0,
-                        'tool_success_rate': 0.0,
-                        'cache_hit_rate': 0.0
-                    }
+                    _prompt_id(prompt['text']): _DEFAULT_STATS.copy()
+                    for prompt in (system_prompts or [])
+                },
+                'prompt_id_map': {
+                    _prompt_id(prompt['text']): prompt['text']
                     for prompt in (system_prompts or [])
                 },
                 'current_context': context,
@@ -147,82 +387,357 @@ class SessionManager:
                 }
             }
         )
+        self._persisted_messages = 0
+        self._header_saved = False
+        self._prompt_keys_len = -1
         logger.debug(f"Session created with ID: {self.current_session.session_id}")
         return self.current_session
 
-    def load_session(self, session_id: str) -> Optional[ConversationSession]:
+    async def load_session(self, session_id: str) -> Optional[ConversationSession]:
         """Load an existing session by ID with cache cleanup"""
-        session_file = os.path.join(self.sessions_dir, f"{session_id}.json")
-        if os.path.exists(session_file):
-            with open(session_file, 'r') as f:
-                data = json.load(f)
-                
-                # Initialize cache block tracking if not present
-                if 'metadata' in data and 'cache_blocks' not in data['metadata']:
-                    data['metadata']['cache_blocks'] = {
-                        'active': 0,
-                        'cleaned': 0,
-                        'total_created': 0
-                    }
-                
-                # Clear any existing cache blocks from previous load
-                if 'metadata' in data and 'cache_blocks' in data['metadata']:
-                    cleaned = data['metadata']['cache_blocks'].get('active', 0)
-                    data['metadata']['cache_blocks'].update({
-                        'active': 0,
-                        'cleaned': data['metadata']['cache_blocks'].get('cleaned', 0) + cleaned
-                    })
-                
-                self.current_session = ConversationSession.from_dict(data)
-                logger.debug(f"Loaded session {session_id} with cache cleanup")
-                return self.current_session
-        return None
-
-    def save_session(self):
+        self.flush_stats()
+        await self.flush()
+        cached = self._session_cache.get(session_id)
+        if cached is not None:
+            self._session_cache.move_to_end(session_id)
+            _reset_cache_blocks(cached.metadata)
+            # Cached sessions are only ever mutated through this manager,
+            # which persists every message as it's added
+            self.current_session = cached
+            self._prompt_keys_len = -1
+            self._persisted_messages = len(cached.messages)
+            self._header_saved = True
+            logger.debug(f"Loaded session {session_id} from memory with cache cleanup")
+            return cached
+        
+        session_file = self._header_path(session_id)
+        if not await aiofiles.os.path.exists(session_file):
+            return None
+        async with aiofiles.open(session_file, 'rb') as f:
+            data = orjson.loads(await f.read())
+        
+        # Older sessions keep their messages inline in the header
+        legacy = 'messages' in data
+        torn = False
+        if not legacy:
+            data['messages'], torn = await self._read_messages(session_id)
+        
+        # The header isn't rewritten on every message, so take the
+        # latest activity from the log
+        if data['messages'] and data['messages'][-1].get('timestamp', '') > data['last_active']:
+            data['last_active'] = data['messages'][-1]['timestamp']
+        
+        if 'metadata' in data:
+            _reset_cache_blocks(data['metadata'])
+        
+        self.current_session = ConversationSession.from_dict(data)
+        self._prompt_keys_len = -1
+        # Legacy sessions get their log written on the next save, as do
+        # logs with a torn last line so later appends don't follow it;
+        # neither is cached until it's been rewritten
+        rewrite = legacy or torn
+        self._persisted_messages = 0 if rewrite else len(self.current_session.messages)
+        self._header_saved = not legacy
+        if not rewrite:
+            self._session_cache[session_id] = self.current_session
+            if len(self._session_cache) > SESSION_CACHE_SIZE:
+                self._session_cache.popitem(last=False)
+        logger.debug(f"Loaded session {session_id} with cache cleanup")
+        return self.current_session
+
+    async def save_session(self):
         """Save current session to disk"""
         if self.current_session:
-            session_file = os.path.join(
-                self.sessions_dir,
-                f"{self.current_session.session_id}.json"
+            self.flush_stats()
+            await self._apply_writes(self._collect_writes(header=True), self.current_session)
+
+    async def flush(self):
+        """Persist any changes add_message has deferred"""
+        if not self._dirty or not self.current_session:
+            return
+        await self._apply_writes(
+            self._collect_writes(self._header_dirty or not self._header_saved),
+            self.current_session
+        )
+
+    async def close(self):
+        """Stop background writes and persist anything still pending"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._write_tasks:
+            await asyncio.gather(*self._write_tasks, return_exceptions=True)
+        self.flush_stats()
+        await self.flush()
+        _open_managers.discard(self)
+
+    def _collect_writes(self, header: bool) -> List[Tuple[str, bytes, bool]]:
+        """Serialize the current session's pending changes
+        
+        Returns (path, data, append) tuples and marks the changes persisted,
+        so the snapshot is taken before any await; _writes_failed undoes
+        this if the writes don't land.
+        """
+        session = self.current_session
+        messages = session.messages
+        messages_file = self._messages_path(session.session_id)
+        writes = []
+        
+        if len(messages) < self._persisted_messages or not self._persisted_messages:
+            # Messages were removed (or nothing is on disk yet): rewrite the log
+            writes.append((messages_file, b"".join(orjson.dumps(m) + b"\n" for m in messages), False))
+        elif len(messages) > self._persisted_messages:
+            new_messages = messages[self._persisted_messages:]
+            writes.append((messages_file, b"".join(orjson.dumps(m) + b"\n" for m in new_messages), True))
+        self._persisted_messages = len(messages)
+        
+        # The header holds everything except messages
+        if header:
+            writes.append((
+                self._header_path(session.session_id),
+                orjson.dumps(session.to_dict(include_messages=False), option=orjson.OPT_INDENT_2),
+                False
+            ))
+            self._header_saved = True
+        
+        self._index[session.session_id] = _session_summary(
+            session.session_id,
+            session.start_time.isoformat(),
+            session.last_active.isoformat(),
+            messages[0] if messages else None,
+            len(messages),
+            len(session.tool_usage)
+        )
+        writes.append((self._index_path, orjson.dumps(self._index), False))
+        
+        self._dirty = self._header_dirty = False
+        return writes
+
+    async def _apply_writes(self, writes: List[Tuple[str, bytes, bool]],
+                            session: Optional[ConversationSession] = None):
+        """Write collected session data to disk in order"""
+        self._writes_in_flight += 1
+        try:
+            # The lock is FIFO, so batches land in the order they were collected
+            async with self._write_lock:
+                for path, data, append in writes:
+                    if append:
+                        async with aiofiles.open(path, 'ab') as f:
+                            await f.write(data)
+                    else:
+                        await async_atomic_write(path, data)
+        except BaseException:
+            self._writes_failed(session)
+            raise
+        finally:
+            self._writes_in_flight -= 1
+
+    def _apply_writes_sync(self, writes: List[Tuple[str, bytes, bool]],
+                           session: Optional[ConversationSession] = None):
+        """Write collected session data to disk without an event loop"""
+        try:
+            for path, data, append in writes:
+                if append:
+                    with open(path, 'ab') as f:
+                        f.write(data)
+                else:
+                    atomic_write(path, data)
+        except BaseException:
+            self._writes_failed(session)
+            raise
+
+    def _writes_failed(self, session: Optional[ConversationSession]):
+        """Mark a session whose writes didn't all land for a full rewrite"""
+        if session is None or session is not self.current_session:
+            return
+        # Part of the batch, or a later one, may have reached disk, so
+        # appending from the old position could leave gaps; rewrite the
+        # log and header instead
+        self._persisted_messages = 0
+        self._header_saved = False
+        self._dirty = True
+
+    def _run_writes(self, writes: List[Tuple[str, bytes, bool]], session: ConversationSession):
+        """Apply collected writes in the background, or now if no loop is running"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._apply_writes_sync(writes, session)
+            return
+        task = loop.create_task(self._apply_writes(writes, session))
+        self._write_tasks.add(task)
+        task.add_done_callback(self._write_task_done)
+
+    def _write_task_done(self, task: asyncio.Task):
+        """Forget a finished background write, logging its failure"""
+        self._write_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to save session: {task.exception()}")
+
+    def flush_stats(self):
+        """Fold pending prompt effectiveness updates into session metadata"""
+        if not self._stats_delta or not self.current_session:
+            return
+        metadata = self.current_session.metadata
+        effectiveness = metadata.setdefault('prompt_effectiveness', {})
+        for key, delta in self._stats_delta.items():
+            stats = effectiveness.get(key)
+            if stats is None:
+                stats = effectiveness[key] = _DEFAULT_STATS.copy()
+            stats['uses'] += delta['uses']
+            if 'tool_success_rate' in delta:
+                stats['tool_success_rate'] = delta['tool_success_rate']
+        metadata['prompt_stats_version'] = metadata.get('prompt_stats_version', 0) + 1
+        self._stats_delta = {}
+        self._dirty = self._header_dirty = True
+
+    def get_prompt_effectiveness(self) -> Dict[str, Dict]:
+        """Get prompt effectiveness stats, keyed by prompt id, including
+        updates not yet folded in; metadata['prompt_id_map'] maps ids to text"""
+        if not self.current_session:
+            return {}
+        combined = {
+            key: dict(stats)
+            for key, stats in self.current_session.metadata.get('prompt_effectiveness', {}).items()
+        }
+        for key, delta in self._stats_delta.items():
+            stats = combined.setdefault(key, _DEFAULT_STATS.copy())
+            stats['uses'] += delta['uses']
+            if 'tool_success_rate' in delta:
+                stats['tool_success_rate'] = delta['tool_success_rate']
+        return combined
+
+    def _flush_sync(self):
+        """Persist deferred changes from outside the event loop"""
+        if self._writes_in_flight:
+            # An async batch never finished (its loop is gone), so what it
+            # covered may not be on disk
+            self._writes_failed(self.current_session)
+        self.flush_stats()
+        if self._dirty and self.current_session:
+            self._apply_writes_sync(
+                self._collect_writes(self._header_dirty or not self._header_saved),
+                self.current_session
             )
-            with open(session_file, 'w') as f:
-                json.dump(self.current_session.to_dict(), f, indent=2)
 
-    def archive_session(self, session_id: str) -> bool:
+    def _schedule_flush(self):
+        """Start the background flush task if an event loop is running"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop to defer to, so write through
+            self._flush_sync()
+            return
+        self._flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Periodically persist deferred session changes"""
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush session: {e}")
+
+    async def archive_session(self, session_id: str) -> bool:
         """Archive a session by moving it to the archive directory"""
-        session_file = os.path.join(self.sessions_dir, f"{session_id}.json")
-        if os.path.exists(session_file):
-            archive_file = os.path.join(self.archive_dir, f"{session_id}.json")
-            os.rename(session_file, archive_file)
+        self.flush_stats()
+        await self.flush()
+        if self._write_tasks:
+            await asyncio.gather(*self._write_tasks, return_exceptions=True)
+        self._session_cache.pop(session_id, None)
+        session_file = self._header_path(session_id)
+        if await aiofiles.os.path.exists(session_file):
+            # Both files move with no await in between, so no other
+            # coroutine sees the header gone but the log still in place
+            self._move_to_archive(session_id)
+            if self.current_session and self.current_session.session_id == session_id:
+                # Nothing more may be written for an archived session, or
+                # its log would reappear in the sessions directory
+                self.current_session = None
+                self._persisted_messages = 0
+                self._header_saved = False
+                self._dirty = self._header_dirty = False
+                self._stats_delta = {}
+            if self._index.pop(session_id, None) is not None:
+                await self._apply_writes([(self._index_path, orjson.dumps(self._index), False)])
             return True
         return False
 
-    def list_sessions(self, limit: int = 10) -> List[Dict]:
+    def _move_to_archive(self, session_id: str):
+        """Move a session's header and message log to the archive directory
+        
+        The header goes first since it's what makes a session loadable; if
+        the log can't follow, the header is moved back.
+        """
+        session_file = self._header_path(session_id)
+        archive_file = os.path.join(self.archive_dir, f"{session_id}.json")
+        os.rename(session_file, archive_file)
+        messages_file = self._messages_path(session_id)
+        if os.path.exists(messages_file):
+            try:
+                os.rename(messages_file, os.path.join(self.archive_dir, f"{session_id}.messages.jsonl"))
+            except OSError:
+                os.rename(archive_file, session_file)
+                raise
+
+    async def list_sessions(self, limit: int = 10) -> List[Dict]:
         """List available sessions, defaulting to the 10 most recent"""
-        sessions = []
-        for filename in os.listdir(self.sessions_dir):
-            if filename.endswith('.json'):
-                session_path = os.path.join(self.sessions_dir, filename)
-                with open(session_path, 'r') as f:
-                    data = json.load(f)
-                    # Get first message content for context
-                    first_msg = data['messages'][0]['content'] if data['messages'] else ''
-                    first_msg_text = first_msg.get('text', '') if isinstance(first_msg, dict) else str(first_msg)
-                    # Truncate to first 50 chars
-                    first_msg_preview = first_msg_text[:50] + ('...' if len(first_msg_text) > 50 else '')
-                    
-                    sessions.append({
-                        'session_id': data['session_id'],
-                        'start_time': data['start_time'],
-                        'last_active': data['last_active'],
-                        'message_count': len(data['messages']),
-                        'tool_usage_count': len(data['tool_usage']),
-                        'first_message': first_msg_preview
-                    })
+        await self.flush()
         # Sort by last active and limit to most recent
-        return sorted(sessions, key=lambda x: x['last_active'], reverse=True)[:limit]
+        return sorted(self._index.values(), key=lambda x: x['last_active'], reverse=True)[:limit]
+
+    def _load_index(self) -> Dict[str, Dict]:
+        """Read the session summary index, rebuilding it if it's missing
+        
+        Runs once from __init__, which can't await, so this stays synchronous.
+        """
+        try:
+            with open(self._index_path, 'rb') as f:
+                return orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            logger.debug("Session index missing or unreadable, rebuilding")
+            index = self._rebuild_index()
+            atomic_write(self._index_path, orjson.dumps(index))
+            return index
+
+    def _rebuild_index(self) -> Dict[str, Dict]:
+        """Build the session summary index by reading every session file"""
+        index = {}
+        with os.scandir(self.sessions_dir) as entries:
+            session_paths = [
+                entry.path for entry in entries
+                if entry.name.endswith('.json') and entry.name != INDEX_FILENAME and entry.is_file()
+            ]
+        for session_path in session_paths:
+            data = _read_json_file(session_path)
+            if 'messages' in data:
+                # Legacy session with inline messages
+                messages = data['messages']
+                count = len(messages)
+                first, last = (messages[0], messages[-1]) if messages else (None, None)
+            else:
+                count, first, last = _summarize_message_log(self._messages_path(data['session_id']))
+            last_active = data['last_active']
+            if last and last.get('timestamp', '') > last_active:
+                last_active = last['timestamp']
+            index[data['session_id']] = _session_summary(
+                data['session_id'],
+                data['start_time'],
+                last_active,
+                first,
+                count,
+                len(data['tool_usage'])
+            )
+        return index
 
-    def remove_messages(self, count: int) -> bool:
+    async def remove_messages(self, count: int) -> bool:
         """Remove the last n messages from the conversation"""
         if not self.current_session or not self.current_session.messages:
             return False
@@ -234,30 +749,22 @@ class SessionManager:
             
         # Remove the messages
         self.current_session.messages = self.current_session.messages[:-messages_to_remove]
-        self.save_session()
+        await self.save_session()
         return True
 
-    def update_metadata(self, metadata: Dict, merge: bool = True):
+    async def update_metadata(self, metadata: Dict, merge: bool = True):
         """Update session metadata with merge option"""
         if not self.current_session:
             return
 
         if merge:
             # Deep merge for nested dictionaries
-            def deep_merge(d1: Dict, d2: Dict) -> Dict:
-                for k, v in d2.items():
-                    if k in d1 and isinstance(d1[k], dict) and isinstance(v, dict):
-                        deep_merge(d1[k], v)
-                    else:
-                        d1[k] = v
-                return d1
-            
-            deep_merge(self.current_session.metadata, metadata)
+            _deep_merge(self.current_session.metadata, metadata)
         else:
             # Replace entire metadata
             self.current_session.metadata = metadata.copy()
             
-        self.save_session()
+        await self.save_session()
 
     def add_message(self, content: str, role: str = "user", metadata: Dict = None, cache: bool = False, update_prompts: bool = True):
         """Add a message to the current session"""
@@ -265,43 +772,52 @@ class SessionManager:
             logger.warning("No active session to add message to")
             return
 
+        now = datetime.now()
         message = {
             'role': role,
             'content': content,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'metadata': metadata or {}
         }
 
         # Add cache control if enabled
         if cache:
+            cache_blocks = self.current_session.metadata['cache_blocks']
+            # Block ids only need to be unique within the session, and the
+            # persisted creation count already is
             message['metadata']['cache_control'] = {
                 'type': 'persistent',
-                'block_id': str(uuid.uuid4())
+                'block_id': f"{self.current_session.session_id}:{cache_blocks['total_created']}"
             }
             # Update cache block tracking
-            self.current_session.metadata['cache_blocks']['active'] += 1
-            self.current_session.metadata['cache_blocks']['total_created'] += 1
+            cache_blocks['active'] += 1
+            cache_blocks['total_created'] += 1
 
         self.current_session.messages.append(message)
-        self.current_session.last_active = datetime.now()
+        self.current_session.last_active = now
+        metadata_changed = cache
         
         # Update prompt effectiveness if this is an assistant message
         if role == "assistant" and update_prompts:
-            for prompt in self.current_session.system_prompts:
-                if 'text' in prompt:
-                    stats = self.current_session.metadata['prompt_effectiveness'].get(prompt['text'], {
-                        'uses': 0,
-                        'successful_interactions': 0,
-                        'tool_success_rate': 0.0,
-                        'cache_hit_rate': 0.0
-                    })
-                    stats['uses'] += 1
-                    # Update success metrics based on metadata
-                    if metadata and 'tool_calls' in metadata:
-                        successful_tools = sum(1 for t in metadata['tool_calls'] if t.get('success', False))
-                        total_tools = len(metadata['tool_calls'])
-                        if total_tools > 0:
-                            stats['tool_success_rate'] = successful_tools / total_tools
-                    self.current_session.metadata['prompt_effectiveness'][prompt['text']] = stats
-
-        self.save_session()
+            # Success metrics depend only on this message, so compute them once
+            tool_success_rate = None
+            if metadata and metadata.get('tool_calls'):
+                successful_tools = sum(1 for t in metadata['tool_calls'] if t.get('success', False))
+                tool_success_rate = successful_tools / len(metadata['tool_calls'])
+            
+            # Accumulate in memory; flush_stats folds these into the
+            # persisted map so the header isn't rewritten per message
+            deltas = self._stats_delta
+            for key in self._current_prompt_keys():
+                delta = deltas.get(key)
+                if delta is None:
+                    delta = deltas[key] = {'uses': 0}
+                delta['uses'] += 1
+                if tool_success_rate is not None:
+                    delta['tool_success_rate'] = tool_success_rate
+
+        # Defer the write; the header only needs rewriting when session
+        # metadata changed
+        self._dirty = True
+        self._header_dirty = self._header_dirty or metadata_changed
+        self._schedule_flush()
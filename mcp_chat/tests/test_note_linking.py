@@ -3,9 +3,6 @@ Test module for note linking functionality
 """
 
 import unittest
-from datetime import datetime
-import os
-import json
 from unittest.mock import patch, MagicMock
 
 class TestNoteLinking(unittest.TestCase):
@@ -2,26 +2,33 @@
 Test module for prompt selection functionality
 """
 
-import unittest
-from datetime import datetime
+import asyncio
 import os
-import json
+import shutil
+import tempfile
+import unittest
+from contextlib import AsyncExitStack
+from unittest.mock import patch
 from mcp_chat.prompts.prompt_manager import SystemPromptManager, PromptTemplate
 
 class TestPromptSelection(unittest.TestCase):
     """Test cases for prompt selection system"""
 
-    def setUp(self):
-        """Set up test environment"""
-        self.test_prompts_dir = "chat_history/test_prompts"
-        self.prompt_manager = SystemPromptManager(self.test_prompts_dir)
+    @classmethod
+    def setUpClass(cls):
+        """Set up one prompt manager shared by all tests"""
+        cls.test_prompts_dir = tempfile.mkdtemp(prefix="test_prompts_")
+        # Keep the scratch pad out of the project's data directory
+        cls.scratch_pad_patcher = patch('mcp_chat.prompts.scratch_pad.SCRATCH_PAD_PATH',
+                                        os.path.join(cls.test_prompts_dir, 'scratch-pad.txt'))
+        cls.scratch_pad_patcher.start()
+        cls.prompt_manager = SystemPromptManager({}, AsyncExitStack(), cls.test_prompts_dir)
 
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """Clean up test environment"""
-        if os.path.exists(self.test_prompts_dir):
-            for file in os.listdir(self.test_prompts_dir):
-                os.remove(os.path.join(self.test_prompts_dir, file))
-            os.rmdir(self.test_prompts_dir)
+        cls.scratch_pad_patcher.stop()
+        shutil.rmtree(cls.test_prompts_dir, ignore_errors=True)
 
     def test_task_context_prompts(self):
         """Test prompt selection for task context"""
@@ -31,10 +38,11 @@ class TestPromptSelection(unittest.TestCase):
             'sensitive_data': False
         }
         
-        prompts = self.prompt_manager.get_prompts_by_context(context)
+        prompts = asyncio.run(self.prompt_manager.get_prompts_by_context(context))
         
-        # Should include personality and capabilities prompts
-        self.assertEqual(len(prompts), 3)  # personality + capabilities + session_structure
+        # Should include personality and session structure prompts; no
+        # default template describes capabilities
+        self.assertEqual(len(prompts), 2)  # personality + session_structure
         
         # Verify prompt types by checking content signatures
         prompt_types = set()
@@ -42,12 +50,10 @@ class TestPromptSelection(unittest.TestCase):
             text = prompt["text"].lower()
             if "coach claude" in text and "empathetic" in text:
                 prompt_types.add("personality")
-            if "current time:" in text and "available tools" in text:
-                prompt_types.add("capabilities")
             if "opening check-in" in text and "session close" in text:
                 prompt_types.add("session_structure")
         
-        self.assertEqual(prompt_types, {"personality", "capabilities", "session_structure"})
+        self.assertEqual(prompt_types, {"personality", "session_structure"})
 
     def test_reflection_context_prompts(self):
         """Test prompt selection for reflection context"""
@@ -57,7 +63,7 @@ class TestPromptSelection(unittest.TestCase):
             'sensitive_data': False
         }
         
-        prompts = self.prompt_manager.get_prompts_by_context(context)
+        prompts = asyncio.run(self.prompt_manager.get_prompts_by_context(context))
         
         # Should include personality and memory management prompts
         self.assertEqual(len(prompts), 2)  # personality + memory_management
@@ -81,7 +87,7 @@ class TestPromptSelection(unittest.TestCase):
             'sensitive_data': True
         }
         
-        prompts = self.prompt_manager.get_prompts_by_context(context)
+        prompts = asyncio.run(self.prompt_manager.get_prompts_by_context(context))
         
         # Should include privacy prompt
         privacy_included = False
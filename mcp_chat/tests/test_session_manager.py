@@ -0,0 +1,202 @@
+"""
+Tests for session persistence
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from mcp_chat.session.session_manager import (
+    SessionManager, INDEX_FILENAME, MMAP_THRESHOLD, _summarize_message_log
+)
+
+class TestSessionManager(unittest.TestCase):
+    """Test cases for session storage round trips"""
+
+    def setUp(self):
+        """Give each test its own storage directory"""
+        self.storage_dir = tempfile.mkdtemp(prefix="test_sessions_")
+
+    def tearDown(self):
+        """Clean up test environment"""
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def _contents(self, session):
+        return [m['content'] for m in session.messages]
+
+    def test_add_flush_reload(self):
+        """Messages added and flushed are there after a reload"""
+        async def run():
+            manager = SessionManager(self.storage_dir)
+            session = manager.start_session()
+            manager.add_message("Hello")
+            manager.add_message("Hi there", role="assistant")
+            await manager.flush()
+            manager.add_message("How are you?")
+            await manager.close()
+
+            reloaded = await SessionManager(self.storage_dir).load_session(session.session_id)
+            self.assertIsNotNone(reloaded)
+            self.assertEqual(self._contents(reloaded), ["Hello", "Hi there", "How are you?"])
+            self.assertEqual(reloaded.messages[1]['role'], 'assistant')
+
+            sessions = await SessionManager(self.storage_dir).list_sessions()
+            self.assertEqual(sessions[0]['session_id'], session.session_id)
+            self.assertEqual(sessions[0]['message_count'], 3)
+
+        asyncio.run(run())
+
+    def test_remove_then_add_message(self):
+        """Messages added after a removal replace the removed ones on disk"""
+        async def run():
+            manager = SessionManager(self.storage_dir)
+            session = manager.start_session()
+            for i in range(3):
+                manager.add_message(f"question {i}")
+                manager.add_message(f"answer {i}", role="assistant")
+            await manager.flush()
+
+            self.assertTrue(await manager.remove_messages(1))
+            manager.add_message("new question")
+            await manager.close()
+
+            reloaded = await SessionManager(self.storage_dir).load_session(session.session_id)
+            self.assertEqual(
+                self._contents(reloaded),
+                ["question 0", "answer 0", "question 1", "answer 1", "new question"]
+            )
+
+        asyncio.run(run())
+
+    def test_index_rebuilt_when_missing(self):
+        """list_sessions still works after the index file is deleted"""
+        async def run():
+            manager = SessionManager(self.storage_dir)
+            session = manager.start_session()
+            manager.add_message("Remember this")
+            manager.add_message("Noted", role="assistant")
+            await manager.close()
+
+            os.remove(os.path.join(self.storage_dir, 'sessions', INDEX_FILENAME))
+            sessions = await SessionManager(self.storage_dir).list_sessions()
+            self.assertEqual(len(sessions), 1)
+            self.assertEqual(sessions[0]['session_id'], session.session_id)
+            self.assertEqual(sessions[0]['message_count'], 2)
+            self.assertEqual(sessions[0]['first_message'], "Remember this")
+
+        asyncio.run(run())
+
+    def test_archive_current_session(self):
+        """Archiving the active session keeps later messages out of the sessions directory"""
+        async def run():
+            manager = SessionManager(self.storage_dir)
+            session = manager.start_session()
+            manager.add_message("Hello")
+            manager.add_message("Hi there", role="assistant")
+            await manager.flush()
+
+            self.assertTrue(await manager.archive_session(session.session_id))
+            self.assertIsNone(manager.current_session)
+            manager.add_message("After archiving")
+            await manager.close()
+
+            self.assertEqual(await SessionManager(self.storage_dir).list_sessions(), [])
+            self.assertIsNone(await SessionManager(self.storage_dir).load_session(session.session_id))
+            self.assertEqual(os.listdir(os.path.join(self.storage_dir, 'sessions')), [INDEX_FILENAME])
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(self.storage_dir, 'archived_sessions'))),
+                [f"{session.session_id}.json", f"{session.session_id}.messages.jsonl"]
+            )
+
+        asyncio.run(run())
+
+    def test_torn_last_record(self):
+        """A log cut short mid-append still indexes, loads and takes new messages"""
+        async def run():
+            manager = SessionManager(self.storage_dir)
+            session = manager.start_session()
+            manager.add_message("Hello")
+            manager.add_message("Hi there", role="assistant")
+            await manager.close()
+
+            sessions_dir = os.path.join(self.storage_dir, 'sessions')
+            with open(os.path.join(sessions_dir, f"{session.session_id}.messages.jsonl"), 'ab') as f:
+                f.write(b'{"role": "user", "cont')
+            os.remove(os.path.join(sessions_dir, INDEX_FILENAME))
+
+            manager = SessionManager(self.storage_dir)
+            sessions = await manager.list_sessions()
+            self.assertEqual(sessions[0]['message_count'], 2)
+
+            loaded = await manager.load_session(session.session_id)
+            self.assertEqual(self._contents(loaded), ["Hello", "Hi there"])
+            manager.add_message("How are you?")
+            await manager.close()
+
+            reloaded = await SessionManager(self.storage_dir).load_session(session.session_id)
+            self.assertEqual(self._contents(reloaded), ["Hello", "Hi there", "How are you?"])
+
+        asyncio.run(run())
+
+    def test_summarize_large_log(self):
+        """Memory-mapped logs are summarized with or without a trailing newline"""
+        path = os.path.join(self.storage_dir, "large.messages.jsonl")
+        records = [{'role': 'user', 'content': "x" * 1000, 'index': i} for i in range(100)]
+        body = b"".join(json.dumps(r).encode() + b"\n" for r in records)
+        self.assertGreater(len(body), MMAP_THRESHOLD)
+
+        for tail in (b"", b'{"role": "user", "cont'):
+            with open(path, 'wb') as f:
+                f.write(body + tail)
+            count, first, last = _summarize_message_log(path)
+            self.assertEqual((count, first['index'], last['index']), (100, 0, 99))
+
+        with open(path, 'wb') as f:
+            f.write(body.rstrip(b"\n"))
+        count, first, last = _summarize_message_log(path)
+        self.assertEqual((count, first['index'], last['index']), (100, 0, 99))
+
+        with open(path, 'wb') as f:
+            f.write(json.dumps(records[0]).encode() * 100)
+        self.assertEqual(_summarize_message_log(path), (0, None, None))
+
+    def test_load_legacy_session(self):
+        """Sessions saved as a single file with inline messages still load"""
+        session_id = "legacy-session"
+        legacy = {
+            'session_id': session_id,
+            'start_time': "2024-01-01T09:00:00",
+            'last_active': "2024-01-01T09:05:00",
+            'messages': [
+                {'role': 'user', 'content': "Old question", 'timestamp': "2024-01-01T09:00:00", 'metadata': {}},
+                {'role': 'assistant', 'content': "Old answer", 'timestamp': "2024-01-01T09:05:00", 'metadata': {}}
+            ],
+            'metadata': {},
+            'tool_usage': [],
+            'system_prompts': [{'type': 'text', 'text': "Be helpful"}]
+        }
+        os.makedirs(os.path.join(self.storage_dir, 'sessions'))
+        with open(os.path.join(self.storage_dir, 'sessions', f"{session_id}.json"), 'w') as f:
+            json.dump(legacy, f)
+
+        async def run():
+            manager = SessionManager(self.storage_dir)
+            sessions = await manager.list_sessions()
+            self.assertEqual(sessions[0]['message_count'], 2)
+
+            session = await manager.load_session(session_id)
+            self.assertEqual(self._contents(session), ["Old question", "Old answer"])
+            self.assertEqual(len(session.metadata['prompt_effectiveness']), 1)
+
+            # The next save migrates it to the message log layout
+            manager.add_message("New question")
+            await manager.close()
+            reloaded = await SessionManager(self.storage_dir).load_session(session_id)
+            self.assertEqual(self._contents(reloaded), ["Old question", "Old answer", "New question"])
+
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,24 +2,42 @@
 Tests for system prompts functionality
 """
 
+import asyncio
 import unittest
+import os
 import tempfile
 import shutil
-import os
-from mcp_chat.system_prompts import SystemPromptManager, analyze_message_context, get_system_datetime
+from contextlib import AsyncExitStack
+from unittest.mock import patch
+from mcp_chat.nlp.context_analyzer import analyze_message_context
+from mcp_chat.prompts.prompt_manager import SystemPromptManager, PromptTemplate, get_system_datetime
 
 class TestSystemPrompts(unittest.TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         # Create a temporary directory for test prompts
-        self.test_dir = tempfile.mkdtemp()
-        # Force clean initialization with temporary directory
-        self.prompt_manager = SystemPromptManager(self.test_dir)
-        # Verify templates are loaded
-        print("\nLoaded templates:", list(self.prompt_manager.templates.keys()))
-        
-    def tearDown(self):
-        # Clean up the temporary directory after each test
-        shutil.rmtree(self.test_dir)
+        cls.test_dir = tempfile.mkdtemp()
+        # Keep the scratch pad out of the project's data directory
+        cls.scratch_pad_patcher = patch('mcp_chat.prompts.scratch_pad.SCRATCH_PAD_PATH',
+                                        os.path.join(cls.test_dir, 'scratch-pad.txt'))
+        cls.scratch_pad_patcher.start()
+        # Load templates once for all tests; only this setup adds to them
+        cls.prompt_manager = SystemPromptManager({}, AsyncExitStack(), cls.test_dir)
+        # The defaults don't include a capabilities template, so seed the
+        # one the variable substitution test renders
+        cls.prompt_manager.add_template(PromptTemplate(
+            name="capabilities",
+            content="Current Time: {{datetime}}\n\nAVAILABLE TOOLS:\n{{tools}}",
+            description="Current time and available tools",
+            variables=["datetime", "tools"],
+            tags=["core"]
+        ))
+
+    @classmethod
+    def tearDownClass(cls):
+        # Clean up the temporary directory after all tests
+        cls.scratch_pad_patcher.stop()
+        shutil.rmtree(cls.test_dir)
 
     def test_message_context_analysis(self):
         # Test task detection
@@ -47,6 +65,22 @@ class TestSystemPrompts(unittest.TestCase):
         sensitive_context = analyze_message_context(sensitive_message)
         self.assertTrue(sensitive_context['sensitive_data'])
 
+    def test_long_message_context_analysis(self):
+        # Messages this long go through the spaCy pipeline
+        long_message = (
+            "Let's reflect on how this week went and review my morning routine. "
+            "On Tuesday I skipped journaling in Paris and went straight to email. "
+            "I want to evaluate why that keeps happening before next week."
+        )
+        context = analyze_message_context(long_message)
+        self.assertEqual(context['message_type'], 'reflection')
+        self.assertIn(context['complexity'], ('low', 'medium', 'high'))
+        self.assertIn('entities', context)
+
+        # Without entities the NER pipe is skipped but the rest still runs
+        context = analyze_message_context(long_message, with_entities=False)
+        self.assertIn(context['complexity'], ('low', 'medium', 'high'))
+
     def test_context_based_prompt_selection(self):
         # Test task context
         task_context = {
@@ -55,13 +89,13 @@ class TestSystemPrompts(unittest.TestCase):
             'sensitive_data': False,
             'tools_needed': []
         }
-        task_prompts = self.prompt_manager.get_prompts_by_context(task_context)
+        task_prompts = asyncio.run(self.prompt_manager.get_prompts_by_context(task_context))
         task_prompts_text = [p['text'] for p in task_prompts]
         print("\nTask prompts:", task_prompts_text)
         
-        # Verify capabilities prompt is included with correct content
-        self.assertTrue(any('AVAILABLE TOOLS' in text for text in task_prompts_text),
-                       "Expected 'AVAILABLE TOOLS' in capabilities prompt")
+        # Verify the session structure prompt is included at session start
+        self.assertTrue(any('Opening Check-in' in text for text in task_prompts_text),
+                       "Expected session structure prompt for a task at session start")
         
         # Test reflection context
         reflection_context = {
@@ -70,7 +104,7 @@ class TestSystemPrompts(unittest.TestCase):
             'sensitive_data': False,
             'tools_needed': []
         }
-        reflection_prompts = self.prompt_manager.get_prompts_by_context(reflection_context)
+        reflection_prompts = asyncio.run(self.prompt_manager.get_prompts_by_context(reflection_context))
         reflection_prompts_text = [p['text'] for p in reflection_prompts]
         self.assertTrue(any('Maintain continuity and progress' in text for text in reflection_prompts_text))
         
@@ -81,7 +115,7 @@ class TestSystemPrompts(unittest.TestCase):
             'sensitive_data': True,
             'tools_needed': []
         }
-        private_prompts = self.prompt_manager.get_prompts_by_context(private_context)
+        private_prompts = asyncio.run(self.prompt_manager.get_prompts_by_context(private_context))
         private_prompts_text = [p['text'] for p in private_prompts]
         self.assertTrue(any('Prioritize user privacy' in text for text in private_prompts_text))
 
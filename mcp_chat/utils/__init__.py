@@ -0,0 +1,9 @@
+"""
+Utilities Package
+
+Shared helpers used across the chat components.
+"""
+
+from .file_utils import atomic_write, async_atomic_write
+
+__all__ = ['atomic_write', 'async_atomic_write']
@@ -0,0 +1,36 @@
+"""
+File Utilities Module
+
+Atomic file writes: data goes to a temporary sibling file which is then
+renamed over the destination, so readers never see a truncated file.
+"""
+
+import os
+from typing import Union
+
+import aiofiles
+import aiofiles.os
+
+
+def atomic_write(path: str, data: Union[str, bytes]):
+    """Write text or bytes to path atomically"""
+    tmp_path = path + ".tmp"
+    if isinstance(data, bytes):
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+async def async_atomic_write(path: str, data: Union[str, bytes]):
+    """Write text or bytes to path atomically without blocking the event loop"""
+    tmp_path = path + ".tmp"
+    if isinstance(data, bytes):
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            await f.write(data)
+    else:
+        async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+            await f.write(data)
+    await aiofiles.os.replace(tmp_path, path)
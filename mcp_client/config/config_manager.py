@@ -1,18 +1,38 @@
-import json
+import copy
 import logging
 import os
-from typing import Dict
+from typing import Dict, Tuple
+import orjson
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
+# Parsed and validated configs keyed by path, stored with the file's
+# mtime so an edited config is re-read
+_CONFIG_CACHE: Dict[str, Tuple[int, Dict]] = {}
+
+# Whether .env has been loaded into os.environ for this process
+_dotenv_loaded = False
+
+def _load_dotenv_once():
+    """Load environment variables from .env on first call only"""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        load_dotenv()
+        _dotenv_loaded = True
+
 class ConfigManager:
     DEFAULT_CONFIG_PATH = 'config.json'
     
     def __init__(self, config_path: str = None):
         self.config_path = config_path or self.DEFAULT_CONFIG_PATH
-        load_dotenv()  # Load environment variables from .env
+        _load_dotenv_once()  # Load environment variables from .env
         self.config = self._load_config()
+        # _load_config guarantees an mcpServers dict
+        self._servers: Dict[str, Dict] = self.config['mcpServers']
+        # Resolved server environments; config and os.environ are read
+        # once per server for the life of the instance
+        self._env_cache: Dict[str, Dict] = {}
 
     def get_logging_config(self) -> Dict:
         """Get logging configuration settings"""
@@ -52,19 +72,20 @@ class ConfigManager:
     def _load_config(self) -> Dict:
         """Load MCP server configuration from config file"""
         try:
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
+            mtime = os.stat(self.config_path).st_mtime_ns
+            cached = _CONFIG_CACHE.get(self.config_path)
+            if cached is not None and cached[0] == mtime:
+                return copy.deepcopy(cached[1])
+
+            with open(self.config_path, 'rb') as f:
+                config = orjson.loads(f.read())
             
             # Ensure mcpServers section exists and is a dict
             if 'mcpServers' not in config:
                 config['mcpServers'] = {}
             elif not isinstance(config['mcpServers'], dict):
                 raise ValueError("'mcpServers' must be a dictionary")
-            
-            # Return early if no servers configured
-            if not config['mcpServers']:
-                return config
-                
+
             # Validate each server config
             for server_name, server_config in config['mcpServers'].items():
                 if not isinstance(server_config, dict):
@@ -75,8 +96,9 @@ class ConfigManager:
                     logger.error(f"Invalid config for server '{server_name}': {str(e)}")
                     raise ValueError(f"Invalid server configuration for '{server_name}': {str(e)}")
             
-            return config
-        except json.JSONDecodeError as e:
+            _CONFIG_CACHE[self.config_path] = (mtime, config)
+            return copy.deepcopy(config)
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to parse config file: {str(e)}")
             raise ValueError("Invalid server configuration: JSON parse error")
         except FileNotFoundError as e:
@@ -88,14 +110,17 @@ class ConfigManager:
 
     def get_server_config(self, server_name: str) -> Dict:
         """Get configuration for a specific server"""
-        servers = self.config.get('mcpServers', {})
-        if server_name not in servers:
-            raise KeyError(f"Server '{server_name}' not found in configuration")
-        return servers[server_name]
+        try:
+            return self._servers[server_name]
+        except KeyError:
+            raise KeyError(f"Server '{server_name}' not found in configuration") from None
 
     def get_server_names(self) -> list:
         """Get list of all configured server names"""
-        return list(self.config.get('mcpServers', {}).keys())
+        return list(self._servers)
+
+    # Name used by older callers
+    get_all_server_names = get_server_names
 
     def get_env_var(self, var_name: str, default: str = None) -> str:
         """Get environment variable with optional default"""
@@ -103,6 +128,14 @@ class ConfigManager:
 
     def get_server_env(self, server_name: str) -> Dict:
         """Get environment variables for a specific server"""
+        env = self._env_cache.get(server_name)
+        if env is None:
+            env = self._env_cache[server_name] = self._resolve_server_env(server_name)
+        # Copy so callers can't modify the cached environment
+        return dict(env)
+
+    def _resolve_server_env(self, server_name: str) -> Dict:
+        """Resolve $VAR references in a server's configured environment"""
         server_config = self.get_server_config(server_name)
         env = server_config.get('env', {})
         
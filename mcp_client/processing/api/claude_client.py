@@ -3,30 +3,57 @@
 import asyncio
 import logging
 import os
-from typing import Dict, List, Optional, Tuple
-from anthropic import Anthropic
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple
+import orjson
+from anthropic import AsyncAnthropic
+
+from ..cache.cache_metrics import CacheMetrics
 
 logger = logging.getLogger(__name__)
 
+# One async client per event loop and API key, so every ClaudeClient on a
+# loop shares the same pooled HTTP connections. The pool belongs to the loop
+# it was opened on, so clients aren't shared across loops, and are dropped
+# along with their loop.
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncAnthropic]]" = weakref.WeakKeyDictionary()
+
+def _get_anthropic_client(api_key: str, timeout: float) -> AsyncAnthropic:
+    """Get the shared async Anthropic client for an API key on the running loop"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No loop to tie the client to, so it isn't shared
+        return AsyncAnthropic(api_key=api_key, timeout=timeout)
+    clients = _CLIENTS.setdefault(loop, {})
+    client = clients.get(api_key)
+    if client is None:
+        client = clients[api_key] = AsyncAnthropic(api_key=api_key, timeout=timeout)
+    return client
+
 class ClaudeClient:
     """Manages Claude API interactions."""
     
-    def __init__(self, anthropic_client: Optional[Anthropic] = None):
-        """Initialize with optional Anthropic client."""
+    def __init__(self, anthropic_client: Optional[AsyncAnthropic] = None):
+        """Initialize with optional async Anthropic client."""
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY environment variable is required")
-        self.anthropic = anthropic_client or Anthropic(api_key=api_key)
         self.model = "claude-3-5-sonnet-20241022"
         self.api_timeout = 30  # timeout for API calls in seconds
+        self.anthropic = anthropic_client or _get_anthropic_client(api_key, self.api_timeout)
         
     async def create_message(self, 
                            messages: List[Dict],
                            tools: List[Dict],
                            system: Optional[List[Dict]] = None,
-                           max_tokens: int = 2000) -> Tuple[Dict, Dict]:
+                           max_tokens: int = 2000,
+                           on_text: Optional[Callable[[str], None]] = None) -> Tuple[Dict, Dict]:
         """Create a message using the Claude API.
         
+        When on_text is given the response is streamed, and text is passed to
+        it as it arrives, formatted the same way as process_response.
+        
         Returns:
             Tuple containing:
             - API response
@@ -36,60 +63,52 @@ class ClaudeClient:
             "model": self.model,
             "max_tokens": max_tokens,
             "messages": messages,
-            "tools": tools
+            "tools": tools,
+            **({"system": system} if system else {})
         }
-        if system:
-            create_params["system"] = system
             
         try:
-            loop = asyncio.get_event_loop()
-            response = await asyncio.wait_for(
-                loop.run_in_executor(
-                    None,
-                    lambda: self.anthropic.messages.create(**create_params)
-                ),
-                timeout=self.api_timeout
-            )
-            
-            # Extract usage metrics
-            usage = response.usage
-            metrics = {
-                'cache_creation_input_tokens': getattr(usage, 'cache_creation_input_tokens', 0),
-                'cache_read_input_tokens': getattr(usage, 'cache_read_input_tokens', 0),
-                'input_tokens': getattr(usage, 'input_tokens', 0),
-                'output_tokens': getattr(usage, 'output_tokens', 0)
-            }
+            if on_text is None:
+                request = self.anthropic.messages.create(**create_params)
+            else:
+                request = self._stream_message(create_params, on_text)
+            response = await asyncio.wait_for(request, timeout=self.api_timeout)
             
-            return response, metrics
+            return response, CacheMetrics.process_metrics(response.usage)
             
         except asyncio.TimeoutError:
             raise TimeoutError(f"Claude API call timed out after {self.api_timeout} seconds")
         except Exception as e:
             raise RuntimeError(f"Claude API call failed: {str(e)}")
             
-    def process_response(self, response) -> Tuple[List[str], bool, Optional[Tuple[str, Dict]]]:
+    async def _stream_message(self, create_params: Dict, on_text: Callable[[str], None]):
+        """Stream a message, forwarding text deltas, and return the final message."""
+        async with self.anthropic.messages.stream(**create_params) as stream:
+            async for event in stream:
+                if event.type == 'content_block_start' and event.content_block.type == 'text':
+                    on_text("\n[Thinking]\n")
+                elif event.type == 'text':
+                    on_text(event.text)
+            return await stream.get_final_message()
+            
+    def process_response(self, response) -> Tuple[List[str], List[Tuple[str, Dict]]]:
         """Process API response and extract relevant information.
         
         Returns:
             Tuple containing:
             - List of display text
-            - Flag indicating if tool call was found
-            - Tuple of tool name and args if tool call found, None otherwise
+            - List of (tool name, tool args) for each tool call, in order
         """
         display_text = []
-        has_tool_call = False
-        tool_call_info = None
+        tool_calls = []
         
         for content in response.content:
-            if content.type == 'text':
-                thinking = f"\n[Thinking]\n{content.text}"
-                print(thinking)
-                display_text.append(thinking)
+            content_type = content.type
+            if content_type == 'text':
+                display_text.append(f"\n[Thinking]\n{content.text}")
                 
-            elif content.type == 'tool_use':
-                has_tool_call = True
-                tool_name = content.name
-                tool_args = content.input if isinstance(content.input, dict) else json.loads(content.input)
-                tool_call_info = (tool_name, tool_args)
+            elif content_type == 'tool_use':
+                tool_args = content.input if isinstance(content.input, dict) else orjson.loads(content.input)
+                tool_calls.append((content.name, tool_args))
                 
-        return display_text, has_tool_call, tool_call_info
+        return display_text, tool_calls
@@ -1,10 +1,33 @@
 """Handles cache performance metrics and analysis."""
 
+import functools
 import logging
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+_DISPLAY_TEMPLATE = (
+    "Cache Creation Tokens: {0}\n"
+    "Cache Read Tokens: {1}\n"
+    "Uncached Input Tokens: {2}\n"
+    "Output Tokens: {3}"
+)
+
+@functools.lru_cache(maxsize=128)
+def _format_display(creation: int, read: int, uncached: int, output: int) -> Tuple[Tuple[str, ...], Optional[float]]:
+    """Format display lines for a set of token counts, with the cache hit rate if any."""
+    display = ["\n[Cache Performance]"]
+    display.extend(_DISPLAY_TEMPLATE.format(creation, read, uncached, output).split("\n"))
+    
+    # Calculate and add cache hit rate
+    total_input = creation + read + uncached
+    cache_hit_rate = None
+    if total_input > 0:
+        cache_hit_rate = (read / total_input) * 100
+        display.append(f"Cache Hit Rate: {cache_hit_rate:.1f}%")
+        
+    return tuple(display), cache_hit_rate
+
 class CacheMetrics:
     """Manages cache performance metrics and analysis."""
     
@@ -12,9 +35,10 @@ class CacheMetrics:
     def process_metrics(usage) -> Dict:
         """Process and return cache metrics from API usage data."""
         try:
+            # The SDK reports these as None when caching wasn't involved
             metrics = {
-                'cache_creation_input_tokens': usage.cache_creation_input_tokens,
-                'cache_read_input_tokens': usage.cache_read_input_tokens,
+                'cache_creation_input_tokens': usage.cache_creation_input_tokens or 0,
+                'cache_read_input_tokens': usage.cache_read_input_tokens or 0,
                 'input_tokens': usage.input_tokens,
                 'output_tokens': usage.output_tokens
             }
@@ -32,30 +56,28 @@ class CacheMetrics:
     @staticmethod
     def format_metrics_display(metrics: Dict) -> list:
         """Format cache metrics for display."""
-        display = [
-            "\n[Cache Performance]",
-            f"Cache Creation Tokens: {metrics['cache_creation_input_tokens']}",
-            f"Cache Read Tokens: {metrics['cache_read_input_tokens']}",
-            f"Uncached Input Tokens: {metrics['input_tokens']}",
-            f"Output Tokens: {metrics['output_tokens']}"
-        ]
-        
-        # Calculate and add cache hit rate
-        total_input = (metrics['cache_creation_input_tokens'] + 
-                      metrics['cache_read_input_tokens'] + 
-                      metrics['input_tokens'])
-        if total_input > 0:
-            cache_hit_rate = (metrics['cache_read_input_tokens'] / total_input) * 100
-            display.append(f"Cache Hit Rate: {cache_hit_rate:.1f}%")
-            logger.info(f"Cache Hit Rate: {cache_hit_rate:.1f}%")
+        display, cache_hit_rate = _format_display(
+            metrics['cache_creation_input_tokens'],
+            metrics['cache_read_input_tokens'],
+            metrics['input_tokens'],
+            metrics['output_tokens']
+        )
+        if cache_hit_rate is not None:
+            logger.info("Cache Hit Rate: %.1f%%", cache_hit_rate)
             
-        return display
+        return list(display)
 
     @staticmethod
     def log_metrics(metrics: Dict):
         """Log cache performance metrics."""
-        logger.info("Cache Performance Metrics:")
-        logger.info(f"  Cache Creation Tokens: {metrics['cache_creation_input_tokens']}")
-        logger.info(f"  Cache Read Tokens: {metrics['cache_read_input_tokens']}")
-        logger.info(f"  Uncached Input Tokens: {metrics['input_tokens']}")
-        logger.info(f"  Output Tokens: {metrics['output_tokens']}")
+        logger.info(
+            "Cache Performance Metrics:\n"
+            "  Cache Creation Tokens: %s\n"
+            "  Cache Read Tokens: %s\n"
+            "  Uncached Input Tokens: %d\n"
+            "  Output Tokens: %d",
+            metrics['cache_creation_input_tokens'],
+            metrics['cache_read_input_tokens'],
+            metrics['input_tokens'],
+            metrics['output_tokens']
+        )
@@ -8,36 +8,34 @@ logger = logging.getLogger(__name__)
 class CacheStrategy:
     """Manages cache block reduction strategies."""
     
-    @staticmethod
-    def remove_cache_control(block: Dict) -> Dict:
-        """Remove cache_control from a block while preserving other fields."""
-        return {k: v for k, v in block.items() if k != 'cache_control'}
-    
     @staticmethod
     def strategy_keep_recent_system(system: List[Dict], tools: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
-        """Strategy 1: Keep only two most recent system blocks cached."""
-        return (
-            [block if i >= len(system)-2 else CacheStrategy.remove_cache_control(block) 
-             for i, block in enumerate(system)],
-            tools
-        )
+        """Strategy 1: Keep only two most recent system blocks cached.
+        
+        Like the other strategies, this strips cache_control in place from
+        the block copies made by apply_strategies.
+        """
+        for block in system[:-2]:
+            block.pop('cache_control', None)
+        return system, tools
     
     @staticmethod
     def strategy_minimal_cache(system: List[Dict], tools: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
         """Strategy 2: Keep only one system block and one tool cached."""
-        return (
-            [block if i == len(system)-1 else CacheStrategy.remove_cache_control(block) 
-             for i, block in enumerate(system)],
-            [tools[0]] + [CacheStrategy.remove_cache_control(tool) for tool in tools[1:]]
-        )
+        for block in system[:-1]:
+            block.pop('cache_control', None)
+        for tool in tools[1:]:
+            tool.pop('cache_control', None)
+        return system, tools
     
     @staticmethod
     def strategy_no_cache(system: List[Dict], tools: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
         """Strategy 3: Remove all cache blocks."""
-        return (
-            [CacheStrategy.remove_cache_control(block) for block in system],
-            [CacheStrategy.remove_cache_control(tool) for tool in tools]
-        )
+        for block in system:
+            block.pop('cache_control', None)
+        for tool in tools:
+            tool.pop('cache_control', None)
+        return system, tools
     
     @classmethod
     def get_strategies(cls):
@@ -1,48 +1,72 @@
 """Handles message formatting and context preparation."""
 
 import logging
+import time
 from datetime import datetime
 from typing import Dict, List, Optional, Union
 import os
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
+# Message content shapes that are already content block lists, or a
+# single block to wrap; anything else is sent as text
+_WRAP = {
+    dict: lambda content: [content],
+    list: lambda content: content
+}
+
+# Last formatted timestamp as [epoch second, formatted string]
+_timestamp_cache = [-1, '']
+
+def _current_timestamp() -> str:
+    """Get the current local time formatted for system prompts
+    
+    The formatted value only changes once per second, so it is cached
+    until the wall clock moves to the next second.
+    """
+    now = time.time()
+    second = int(now)
+    if second != _timestamp_cache[0]:
+        _timestamp_cache[0] = second
+        _timestamp_cache[1] = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S %Z')
+    return _timestamp_cache[1]
+
 class MessageFormatter:
     """Formats messages and manages context for API calls."""
     
     @staticmethod
-    def process_system_prompts(context: List[Dict]) -> List[Dict]:
-        """Process and format system prompts from context."""
-        system_prompts = []
-        
-        for msg in context:
-            if msg.get('role') == 'system':
-                content = msg.get('content', '')
-                
-                # Handle list of content blocks
-                if isinstance(content, list):
-                    for block in content:
-                        if isinstance(block, dict) and 'type' in block and 'text' in block:
-                            system_prompts.append(block)
-                        else:
-                            system_prompts.append({
-                                'type': 'text',
-                                'text': str(block)
-                            })
-                # Handle single content block
+    def _append_system_content(system_prompts: List[Dict], content: Union[str, Dict, List]) -> None:
+        """Append the blocks of one system message's content."""
+        # Handle list of content blocks
+        if isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and 'type' in block and 'text' in block:
+                    system_prompts.append(block)
                 else:
-                    if isinstance(content, dict) and 'type' in content and 'text' in content:
-                        system_prompts.append(content)
-                    else:
-                        system_prompts.append({
-                            'type': 'text',
-                            'text': str(content)
-                        })
-        
+                    system_prompts.append({
+                        'type': 'text',
+                        'text': str(block)
+                    })
+        # Handle single content block
+        else:
+            if isinstance(content, dict) and 'type' in content and 'text' in content:
+                system_prompts.append(content)
+            else:
+                system_prompts.append({
+                    'type': 'text',
+                    'text': str(content)
+                })
+
+    @staticmethod
+    def _finalize_system_prompts(system_prompts: List[Dict]) -> List[Dict]:
+        """Add the current time to the first prompt and cache the last."""
         if system_prompts:
-            # Add time to first prompt's text
-            first_prompt = system_prompts[0]
-            first_prompt['text'] = f"{first_prompt['text']}\n\nCurrent time and date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S %Z')}"
+            # Add time to a copy of the first prompt, since the block may
+            # be the caller's and would otherwise gain a stamp per call
+            first_prompt = system_prompts[0] = system_prompts[0].copy()
+            first_prompt['text'] = f"{first_prompt['text']}\n\nCurrent time and date: {_current_timestamp()}"
             
             # Add all prompts except last to system array
             system = system_prompts[:-1]
@@ -58,33 +82,34 @@ class MessageFormatter:
         return []
 
     @staticmethod
-    def process_messages(context: List[Dict]) -> List[Dict]:
-        """Process and format non-system messages from context."""
-        messages = []
-        
+    def _format_message(role: str, content: Union[str, Dict, List]) -> Dict:
+        """Format one non-system message."""
+        wrap = _WRAP.get(type(content))
+        return {
+            'role': role,
+            'content': wrap(content) if wrap else [{
+                'type': 'text',
+                'text': str(content)
+            }]
+        }
+
+    @classmethod
+    def process_system_prompts(cls, context: List[Dict]) -> List[Dict]:
+        """Process and format system prompts from context."""
+        system_prompts = []
         for msg in context:
-            if msg.get('role') != 'system':
-                content = msg.get('content', '')
-                if isinstance(content, dict):
-                    messages.append({
-                        'role': msg.get('role'),
-                        'content': [content]
-                    })
-                elif isinstance(content, list):
-                    messages.append({
-                        'role': msg.get('role'),
-                        'content': content
-                    })
-                else:
-                    messages.append({
-                        'role': msg.get('role'),
-                        'content': [{
-                            'type': 'text',
-                            'text': str(content)
-                        }]
-                    })
-        
-        return messages
+            if msg.get('role') == 'system':
+                cls._append_system_content(system_prompts, msg.get('content', ''))
+        return cls._finalize_system_prompts(system_prompts)
+
+    @classmethod
+    def process_messages(cls, context: List[Dict]) -> List[Dict]:
+        """Process and format non-system messages from context."""
+        return [
+            cls._format_message(msg.get('role'), msg.get('content', ''))
+            for msg in context
+            if msg.get('role') != 'system'
+        ]
 
     @staticmethod
     def format_query(query: str) -> List[Dict]:
@@ -99,7 +124,7 @@ class MessageFormatter:
         """Format tool call for message context."""
         return [{
             'type': 'text',
-            'text': f'Using tool: {tool_name} with arguments: {tool_args}'
+            'text': f'Using tool: {tool_name} with arguments: {orjson.dumps(tool_args, default=str).decode()}'
         }]
 
     @staticmethod
@@ -120,11 +145,17 @@ class MessageFormatter:
             - List of system prompts
         """
         messages = []
-        system = []
+        system_prompts = []
         
-        if context:
-            system = cls.process_system_prompts(context)
-            messages = cls.process_messages(context)
+        # Split system prompts from conversation messages in one pass
+        for msg in context or ():
+            role = msg.get('role')
+            content = msg.get('content', '')
+            if role == 'system':
+                cls._append_system_content(system_prompts, content)
+            else:
+                messages.append(cls._format_message(role, content))
+        system = cls._finalize_system_prompts(system_prompts)
             
         formatted_query = cls.format_query(query)
         messages.append({'role': 'user', 'content': formatted_query})
@@ -1,9 +1,11 @@
 import logging
 import asyncio
-from typing import Dict, Optional, Any
+import time
+from typing import Dict, Optional, Any, Tuple
 from enum import Enum
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+
+from ..utils.retry import backoff_delay
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +25,19 @@ class MessageType(Enum):
     TOOL_REQUEST = "tool_request"
     RESOURCE_REQUEST = "resource_request"
 
+_MESSAGE_TYPES = frozenset(t.value for t in MessageType)
+
+# Field each message type requires besides 'type' and 'server', with the
+# name used for that type in validation errors
+_REQUIRED_FIELDS = {
+    MessageType.TOOL_REQUEST.value: ("tool", "Tool request"),
+    MessageType.RESOURCE_REQUEST.value: ("uri", "Resource request")
+}
+
 @dataclass
 class MessageContext:
     """Context information for message processing."""
-    timestamp: datetime
+    timestamp: float  # time.monotonic() when the context was created
     retry_count: int = 0
     max_retries: int = 2
     last_error: Optional[Exception] = None
@@ -34,14 +45,24 @@ class MessageContext:
 class MessageProcessor:
     """Handles MCP protocol messages for tool and resource requests with robust error handling."""
     
+    # Handler method for each message type
+    _HANDLERS = {
+        MessageType.TOOL_REQUEST.value: "_handle_tool_request",
+        MessageType.RESOURCE_REQUEST.value: "_handle_resource_request"
+    }
+
     def __init__(self, server_manager, query_processor):
         """Initialize MessageProcessor with server manager and query processor."""
         self._server_manager = server_manager
         self._query_processor = query_processor
-        self._message_contexts = {}  # Track message processing context
         self._error_counts = {}  # Track error frequencies
-        self._cleanup_interval = 300  # Clean up old contexts every 5 minutes
-        self._last_cleanup = datetime.now()
+        self._cleanup_interval = 300  # Clean up old error counts every 5 minutes
+        self._cleanup_task: Optional[asyncio.Task] = None  # Started on first message
+        # Health results as (healthy, monotonic check time), reused until
+        # stale so messages don't each probe the server
+        self._health_cache: Dict[str, Tuple[bool, float]] = {}
+        self._health_ttl = 10.0
+        self._health_locks: Dict[str, asyncio.Lock] = {}
 
     async def process_query(self, query: str, context=None):
         """Process a general query using the query processor with error handling."""
@@ -58,41 +79,66 @@ class MessageProcessor:
 
         if "type" not in message:
             raise ValidationError("Missing 'type' field")
-        if message["type"] not in [t.value for t in MessageType]:
-            raise ValidationError(f"Unknown message type: {message['type']}")
+        message_type = message["type"]
+        if not isinstance(message_type, str) or message_type not in _MESSAGE_TYPES:
+            raise ValidationError(f"Unknown message type: {message_type}")
 
         if "server" not in message:
             raise ValidationError("Missing 'server' field")
 
-        if message["type"] == MessageType.TOOL_REQUEST.value:
-            if "tool" not in message:
-                raise ValidationError("Tool request missing 'tool' field")
-        elif message["type"] == MessageType.RESOURCE_REQUEST.value:
-            if "uri" not in message:
-                raise ValidationError("Resource request missing 'uri' field")
+        field, request_name = _REQUIRED_FIELDS[message_type]
+        if field not in message:
+            raise ValidationError(f"{request_name} missing '{field}' field")
 
     async def _verify_server_health(self, server_name: str) -> None:
         """Verify server health before processing message."""
-        try:
-            if not await self._server_manager._check_server_health(server_name):
-                raise ServerError(f"Server '{server_name}' is unhealthy")
-        except Exception as e:
-            raise ServerError(f"Failed to verify server health: {str(e)}")
+        cached = self._health_cache.get(server_name)
+        if cached is None or time.monotonic() - cached[1] >= self._health_ttl:
+            # One probe per server at a time; concurrent messages wait for
+            # it and then use its result
+            lock = self._health_locks.setdefault(server_name, asyncio.Lock())
+            async with lock:
+                cached = self._health_cache.get(server_name)
+                if cached is None or time.monotonic() - cached[1] >= self._health_ttl:
+                    try:
+                        healthy = await self._server_manager._check_server_health(server_name)
+                    except Exception as e:
+                        raise ServerError(f"Failed to verify server health: {str(e)}")
+                    cached = self._health_cache[server_name] = (bool(healthy), time.monotonic())
+        if not cached[0]:
+            raise ServerError(f"Server '{server_name}' is unhealthy")
 
     async def _cleanup_old_contexts(self) -> None:
-        """Clean up old message contexts and error counts."""
-        now = datetime.now()
-        if (now - self._last_cleanup) > timedelta(seconds=self._cleanup_interval):
-            cutoff = now - timedelta(minutes=30)
-            self._message_contexts = {
-                k: v for k, v in self._message_contexts.items()
-                if v.timestamp > cutoff
-            }
-            self._error_counts = {
-                k: v for k, v in self._error_counts.items()
-                if v["timestamp"] > cutoff
-            }
-            self._last_cleanup = now
+        """Clean up old error counts; message contexts are bounded by LRU eviction."""
+        cutoff = time.monotonic() - 1800.0  # 30 minutes
+        self._error_counts = {
+            k: v for k, v in self._error_counts.items()
+            if v["timestamp"] > cutoff
+        }
+
+    def _start_cleanup_task(self) -> None:
+        """Start the background cleanup task if it isn't running."""
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self._periodic_cleanup())
+
+    async def stop_cleanup_task(self) -> None:
+        """Stop the background cleanup task"""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            self._cleanup_task = None
+
+    async def _periodic_cleanup(self) -> None:
+        """Periodically clean up old error counts"""
+        while True:
+            await asyncio.sleep(self._cleanup_interval)
+            try:
+                await self._cleanup_old_contexts()
+            except Exception:
+                logger.error("Error cleaning up message contexts", exc_info=True)
 
     def _should_retry(self, error: Exception, context: MessageContext) -> bool:
         """Determine if operation should be retried based on error type and context."""
@@ -109,16 +155,32 @@ class MessageProcessor:
             
         return False
 
+    async def _handle_tool_request(self, message: Dict) -> Dict:
+        """Call the requested tool."""
+        tool_name = message["tool"]
+        params = message.get("params", {})
+        response = await self._server_manager.call_tool(tool_name, params)
+        if not response:
+            raise ServerError(f"Tool '{tool_name}' call failed")
+        return response
+
+    async def _handle_resource_request(self, message: Dict) -> Dict:
+        """Fetch the requested resource."""
+        uri = message["uri"]
+        response = await self._server_manager.get_resource(uri)
+        if not response:
+            raise ServerError(f"Failed to get resource: {uri}")
+        return response
+
     async def handle_message(self, message: Dict) -> Dict:
         """Handle incoming MCP messages with comprehensive error handling and retry logic."""
-        message_id = id(message)
-        if message_id not in self._message_contexts:
-            self._message_contexts[message_id] = MessageContext(timestamp=datetime.now())
-        context = self._message_contexts[message_id]
-
+        self._start_cleanup_task()
         try:
             # Validate message format
             self._validate_message(message)
+            # Retries all happen within this call, so each message gets a
+            # fresh context rather than one looked up by a reusable id
+            context = MessageContext(timestamp=time.monotonic())
             
             server_name = message["server"]
             message_type = message["type"]
@@ -126,38 +188,32 @@ class MessageProcessor:
             # Verify server health
             await self._verify_server_health(server_name)
             
-            # Process message based on type
-            try:
-                if message_type == MessageType.TOOL_REQUEST.value:
-                    tool_name = message["tool"]
-                    params = message.get("params", {})
-                    response = await self._server_manager.call_tool(tool_name, params)
-                    if not response:
-                        raise ServerError(f"Tool '{tool_name}' call failed")
-                    return response
-                    
-                elif message_type == MessageType.RESOURCE_REQUEST.value:
-                    uri = message["uri"]
-                    response = await self._server_manager.get_resource(uri)
-                    if not response:
-                        raise ServerError(f"Failed to get resource: {uri}")
-                    return response
+            # Process message based on type; _validate_message has already
+            # rejected unknown types
+            handler = getattr(self, self._HANDLERS[message_type])
+            
+            # Retries repeat only the request, not validation or the
+            # health check above
+            delay = 0.0
+            while True:
+                try:
+                    return await handler(message)
+                        
+                except Exception as e:
+                    # Track error frequency
+                    error_key = f"{server_name}:{message_type}"
+                    if error_key not in self._error_counts:
+                        self._error_counts[error_key] = {"count": 0, "timestamp": time.monotonic()}
+                    self._error_counts[error_key]["count"] += 1
                     
-            except Exception as e:
-                # Track error frequency
-                error_key = f"{server_name}:{message_type}"
-                if error_key not in self._error_counts:
-                    self._error_counts[error_key] = {"count": 0, "timestamp": datetime.now()}
-                self._error_counts[error_key]["count"] += 1
-                
-                # Check if we should retry
-                if self._should_retry(e, context):
+                    # Check if we should retry
+                    if not self._should_retry(e, context):
+                        raise
                     context.retry_count += 1
                     context.last_error = e
-                    logger.warning(f"Retrying message (attempt {context.retry_count})")
-                    return await self.handle_message(message)
-                    
-                raise
+                    delay = backoff_delay(delay)
+                    logger.warning(f"Retrying message in {delay:.2f}s (attempt {context.retry_count})")
+                    await asyncio.sleep(delay)
 
         except MessageError as e:
             logger.error(f"Message processing error: {str(e)}")
@@ -166,7 +222,3 @@ class MessageProcessor:
         except Exception as e:
             logger.error(f"Unexpected error processing message: {str(e)}", exc_info=True)
             raise MessageError(f"Message processing failed: {str(e)}")
-            
-        finally:
-            # Clean up old contexts periodically
-            await self._cleanup_old_contexts()
@@ -1,19 +1,21 @@
 """Main query processor orchestrating all components with robust error handling."""
 
 import asyncio
-import json
 import logging
+import sys
 import time
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
+import orjson
 
 from .api.claude_client import ClaudeClient
 from .cache.cache_metrics import CacheMetrics
 from .cache.cache_strategy import CacheStrategy
 from .message.message_formatter import MessageFormatter
 from .tool.tool_handler import ToolHandler
+from ..utils.retry import backoff_delay
 
 logger = logging.getLogger(__name__)
 
@@ -55,16 +57,24 @@ class ProcessingContext:
 class QueryProcessor:
     """Orchestrates query processing using modular components with comprehensive error handling."""
     
-    def __init__(self, server_manager, anthropic_client=None):
-        """Initialize QueryProcessor with its components."""
+    def __init__(self, server_manager, anthropic_client=None, emit_stdout: bool = True):
+        """Initialize QueryProcessor with its components.
+        
+        emit_stdout controls whether response text and tool activity are
+        echoed to stdout while a query runs.
+        """
         self.claude_client = ClaudeClient(anthropic_client)
-        self.tool_handler = ToolHandler(server_manager)
+        self.tool_handler = ToolHandler(server_manager, emit_stdout)
+        self.emit_stdout = emit_stdout
         self.max_iterations = 10
         self.max_retries = 3
         self.retry_delay = 1  # seconds
         self.tool_timeout = 30  # seconds
         self.processing_timeout = 300  # seconds
-        self._active_contexts = {}  # Track active processing contexts
+        self._inflight = {}  # (tool name, args) -> future of in-flight tool calls
+        self.non_idempotent_tools = set()  # Tools that must never be coalesced
+        self._initialized = asyncio.Event()  # Set once initialize() has succeeded
+        self._init_lock = asyncio.Lock()
         
     async def initialize(self, timeout: int = 120) -> bool:
         """Initialize the query processor with enhanced error handling."""
@@ -92,6 +102,7 @@ class QueryProcessor:
                 raise InitializationError("Initialization returned False")
                 
             context.state = ProcessingState.COMPLETED
+            self._initialized.set()
             return True
             
         except asyncio.TimeoutError:
@@ -105,16 +116,82 @@ class QueryProcessor:
             context.last_error = e
             logger.error(f"Initialization failed: {str(e)}", exc_info=True)
             return False
+            
+    async def _ensure_initialized(self) -> bool:
+        """Run initialize() once, sharing the result with concurrent queries."""
+        if self._initialized.is_set():
+            return True
+        async with self._init_lock:
+            if self._initialized.is_set():
+                return True
+            return await self.initialize()
+        
+    def _emit_text(self, text: str) -> None:
+        """Write streamed response text to stdout as it arrives."""
+        sys.stdout.write(text)
+        sys.stdout.flush()
+        
+    def _rate_limit_delay(self, error: BaseException) -> Optional[float]:
+        """Seconds to wait if error was caused by rate limiting, else None."""
+        while error is not None:
+            if getattr(error, 'status_code', None) == 429:
+                response = getattr(error, 'response', None)
+                retry_after = response.headers.get('retry-after') if response is not None else None
+                try:
+                    return float(retry_after)
+                except (TypeError, ValueError):
+                    return float(self.retry_delay)
+            error = error.__cause__ or error.__context__
+        return None
         
     async def _execute_tool_with_retry(
         self,
         tool_name: str,
         tool_args: dict,
         context: ProcessingContext
+    ) -> Tuple[Optional[Dict], Optional[str]]:
+        """Execute a tool with retry logic, coalescing identical in-flight calls.
+        
+        Concurrent calls with the same tool name and arguments share a single
+        execution unless the tool is listed in non_idempotent_tools. A call
+        that joined one which failed runs the tool itself, with its own retries.
+        """
+        if tool_name in self.non_idempotent_tools:
+            return await self._run_tool_with_retry(tool_name, tool_args, context)
+            
+        key = (tool_name, orjson.dumps(tool_args, option=orjson.OPT_SORT_KEYS, default=str))
+        pending = self._inflight.get(key)
+        if pending is not None:
+            logger.debug("Joining in-flight call to tool %s", tool_name)
+            context.state = ProcessingState.EXECUTING_TOOL
+            context.tool_executions += 1
+            outcome = await asyncio.shield(pending)
+            if outcome[1] is None:
+                return outcome
+            logger.debug("Joined call to tool %s failed, retrying it separately", tool_name)
+            return await self._run_tool_with_retry(tool_name, tool_args, context)
+            
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            outcome = await self._run_tool_with_retry(tool_name, tool_args, context)
+            future.set_result(outcome)
+            return outcome
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                future.set_result((None, f"Tool {tool_name} execution was interrupted"))
+        
+    async def _run_tool_with_retry(
+        self,
+        tool_name: str,
+        tool_args: dict,
+        context: ProcessingContext
     ) -> Tuple[Optional[Dict], Optional[str]]:
         """Execute a tool with retry logic."""
         retry_count = 0
         last_error = None
+        delay = 0.0
         
         while retry_count < self.max_retries:
             try:
@@ -141,27 +218,28 @@ class QueryProcessor:
                 
             retry_count += 1
             if retry_count < self.max_retries:
-                delay = self.retry_delay * (2 ** (retry_count - 1))
-                logger.info(f"Retrying tool execution in {delay}s")
+                delay = backoff_delay(delay, base=self.retry_delay)
+                logger.info(f"Retrying tool execution in {delay:.2f}s")
                 await asyncio.sleep(delay)
                 
         return None, last_error
 
     async def process_query(self, query: str, context: Optional[List[Dict]] = None) -> str:
         """Process a query with comprehensive error handling and recovery."""
-        query_id = id(query)
         proc_context = ProcessingContext(
             state=ProcessingState.PREPARING,
             start_time=datetime.now()
         )
-        self._active_contexts[query_id] = proc_context
         final_text = []
         
         try:
             # Verify initialization
-            if not await self.initialize():
+            if not await self._ensure_initialized():
                 raise InitializationError("QueryProcessor not properly initialized")
             
+            # Only stream when the text is echoed as it arrives
+            on_text = self._emit_text if self.emit_stdout else None
+            
             # Start processing with timeout protection
             async def process_with_timeout():
                 try:
@@ -174,16 +252,20 @@ class QueryProcessor:
                     # Process query with iterations
                     while proc_context.iteration < self.max_iterations:
                         proc_context.iteration += 1
-                        current_text = []
+                        # Blocks from this iteration start here, so a
+                        # retried iteration can drop its partial output
+                        iteration_start = len(final_text)
                         
                         try:
                             # Make API call with retry logic
+                            delay = 0.0
                             for attempt in range(self.max_retries):
                                 try:
                                     response, metrics = await self.claude_client.create_message(
                                         messages=messages,
                                         tools=available_tools,
-                                        system=system
+                                        system=system,
+                                        on_text=on_text
                                     )
                                     break
                                 except Exception as e:
@@ -191,11 +273,12 @@ class QueryProcessor:
                                         # Handle cache block limit
                                         logger.warning("Cache block limit exceeded, attempting recovery")
                                         
-                                        async def api_call_func(sys, tools):
+                                        async def api_call_func(sys_blocks, tools):
                                             return await self.claude_client.create_message(
                                                 messages=messages,
                                                 tools=tools,
-                                                system=sys
+                                                system=sys_blocks,
+                                                on_text=on_text
                                             )
                                         
                                         success, new_response, system, available_tools = await CacheStrategy.apply_strategies(
@@ -209,28 +292,36 @@ class QueryProcessor:
                                     if attempt == self.max_retries - 1:
                                         raise APIError(f"API call failed after {self.max_retries} attempts: {str(e)}")
                                     
-                                    delay = self.retry_delay * (2 ** attempt)
-                                    logger.info(f"Retrying API call in {delay}s")
+                                    delay = backoff_delay(delay, base=self.retry_delay)
+                                    logger.info(f"Retrying API call in {delay:.2f}s")
                                     await asyncio.sleep(delay)
                             
                             # Process metrics
-                            current_text.extend(CacheMetrics.format_metrics_display(metrics))
+                            final_text.extend(CacheMetrics.format_metrics_display(metrics))
                             CacheMetrics.log_metrics(metrics)
                             
                             # Process response
-                            current_text.append(f"\n[Iteration {proc_context.iteration}]")
-                            display_text, has_tool_call, tool_call_info = self.claude_client.process_response(response)
-                            current_text.extend(display_text)
+                            final_text.append(f"\n[Iteration {proc_context.iteration}]")
+                            display_text, tool_calls = self.claude_client.process_response(response)
+                            if display_text and on_text:
+                                # Text was already streamed; finish its line
+                                sys.stdout.write("\n")
+                            final_text.extend(display_text)
                             
-                            if has_tool_call and tool_call_info:
-                                tool_name, tool_args = tool_call_info
-                                
-                                # Execute tool with retry logic
-                                result, error = await self._execute_tool_with_retry(
-                                    tool_name, tool_args, proc_context
-                                )
-                                
-                                current_text.extend(self.tool_handler.format_display(
+                            # Without tool calls this response is the answer
+                            if not tool_calls:
+                                proc_context.state = ProcessingState.COMPLETED
+                                return "\n".join(final_text)
+                            
+                            # Execute every tool call from this response
+                            # concurrently, each with its own retry logic
+                            outcomes = await asyncio.gather(*(
+                                self._execute_tool_with_retry(tool_name, tool_args, proc_context)
+                                for tool_name, tool_args in tool_calls
+                            ))
+                            
+                            for (tool_name, tool_args), (result, error) in zip(tool_calls, outcomes):
+                                final_text.extend(self.tool_handler.format_display(
                                     tool_name, tool_args, result, error
                                 ))
                                 
@@ -243,20 +334,25 @@ class QueryProcessor:
                                         {'role': 'assistant', 'content': tool_call_content},
                                         {'role': 'user', 'content': result_msg}
                                     ])
-                            
-                            final_text.extend(current_text)
-                            if not has_tool_call:
-                                break
                                 
                         except Exception as e:
                             logger.error(f"Error in iteration {proc_context.iteration}: {str(e)}", exc_info=True)
                             proc_context.last_error = e
-                            if proc_context.iteration < self.max_iterations:
-                                continue
-                            raise
+                            
+                            # API and cache-block retries have already run by
+                            # now, so re-sending the same messages only helps
+                            # when we were rate limited
+                            delay = self._rate_limit_delay(e)
+                            if (delay is None or proc_context.retries >= self.max_retries
+                                    or proc_context.iteration >= self.max_iterations):
+                                raise
+                            proc_context.retries += 1
+                            del final_text[iteration_start:]
+                            logger.info(f"Rate limited, retrying iteration in {delay:.2f}s")
+                            await asyncio.sleep(delay)
                     
-                    if proc_context.iteration >= self.max_iterations:
-                        final_text.append("\n[Warning]\nReached maximum number of tool call iterations.")
+                    # Only reached when every iteration called tools
+                    final_text.append("\n[Warning]\nReached maximum number of tool call iterations.")
                     
                     proc_context.state = ProcessingState.COMPLETED
                     return "\n".join(final_text)
@@ -281,8 +377,3 @@ class QueryProcessor:
             error_msg = f"Error processing query: {str(e)}"
             logger.error(error_msg, exc_info=True)
             return f"\n[Error]\n{error_msg}"
-            
-        finally:
-            # Clean up context
-            if query_id in self._active_contexts:
-                del self._active_contexts[query_id]
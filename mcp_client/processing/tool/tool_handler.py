@@ -1,21 +1,46 @@
 """Handles tool execution and result management."""
 
-import json
 import logging
+import sys
 from typing import Dict, List, Optional, Tuple
+import orjson
 
 logger = logging.getLogger(__name__)
 
+def _dumps(value) -> str:
+    """Serialize a value to compact JSON"""
+    return orjson.dumps(value, default=str).decode()
+
 class ToolHandler:
     """Manages tool execution and results."""
     
-    def __init__(self, server_manager):
-        """Initialize with server manager."""
+    def __init__(self, server_manager, emit_stdout: bool = True):
+        """Initialize with server manager.
+        
+        emit_stdout controls whether tool calls and results are echoed to stdout.
+        """
         self.server_manager = server_manager
+        self.emit_stdout = emit_stdout
+        self._tools_cache: Optional[Tuple[int, List[Dict]]] = None
+        
+    @property
+    def _tools_version(self) -> int:
+        """Version of the server set the tools were listed from."""
+        return getattr(self.server_manager, 'tools_version', 0)
         
     async def prepare_tools(self) -> List[Dict]:
-        """Get and prepare available tools."""
+        """Get and prepare available tools.
+        
+        The tool list is reused until a server connects or disconnects. A
+        listing that failed for any server bumps the version, so it's
+        fetched again next time.
+        """
         await self.server_manager.check_servers_health()
+        
+        version = self._tools_version
+        if self._tools_cache is not None and self._tools_cache[0] == version:
+            return self._tools_cache[1]
+            
         available_tools = await self.server_manager.get_all_tools()
         logger.info(f"Found {len(available_tools)} available tools")
         
@@ -23,6 +48,7 @@ class ToolHandler:
         if available_tools:
             available_tools[0]['cache_control'] = {'type': 'ephemeral'}
             
+        self._tools_cache = (version, available_tools)
         return available_tools
         
     async def execute_tool(self, tool_name: str, tool_args: Dict) -> Tuple[Optional[str], Optional[str]]:
@@ -34,16 +60,17 @@ class ToolHandler:
             - Error message (if failed)
         """
         try:
-            tool_call_desc = f"\n[Tool Call]\nTool: {tool_name}\nArguments: {json.dumps(tool_args, indent=2)}"
-            print(tool_call_desc)
+            if self.emit_stdout:
+                sys.stdout.write(f"\n[Tool Call]\nTool: {tool_name}\nArguments: {_dumps(tool_args)}\n")
             
             result = await self.server_manager.call_tool(tool_name, tool_args)
             if result is None:
                 error_msg = f"Tool {tool_name} not found"
                 return None, error_msg
                 
-            result_content = json.dumps(result, indent=2)
-            print(f"\n[Tool Result]\n{result_content}")
+            result_content = _dumps(result)
+            if self.emit_stdout:
+                sys.stdout.write(f"\n[Tool Result]\n{result_content}\n")
             
             return result_content, None
             
@@ -61,7 +88,7 @@ class ToolHandler:
         display = []
         
         # Add tool call description
-        tool_call_desc = f"\n[Tool Call]\nTool: {tool_name}\nArguments: {json.dumps(tool_args, indent=2)}"
+        tool_call_desc = f"\n[Tool Call]\nTool: {tool_name}\nArguments: {_dumps(tool_args)}"
         display.append(tool_call_desc)
         
         # Add result or error
@@ -41,6 +41,7 @@ class ServerManager:
         self.config = config
         self.health_check_task = None
         self.health_check_interval = 300  # seconds - increase to 5 minutes
+        self.tools_version = 0  # Bumped whenever the set of server sessions changes or a tool listing fails
         self.query_processor = QueryProcessor(self)
 
     async def start_health_check_task(self):
@@ -392,6 +393,7 @@ class ServerManager:
                     )
                     self.connected_servers.add(server_name)
                     self.last_health_checks[server_name] = datetime.now()
+                    self.tools_version += 1
                     return True
                 except Exception as e:
                     logger.error(f"Failed to establish stdio connection for {server_name}: {str(e)}")
@@ -443,6 +445,7 @@ class ServerManager:
     async def get_all_tools(self) -> list:
         """Collect tools from all connected servers"""
         available_tools = []
+        listing_failed = False
         for server_name, server_info in self.servers.items():
             try:
                 tools_response = await asyncio.wait_for(server_info.session.list_tools(), timeout=120)
@@ -450,10 +453,12 @@ class ServerManager:
                 
                 if not tools_response:
                     logger.error(f"Empty response from {server_name}")
+                    listing_failed = True
                     continue
                 
                 if not hasattr(tools_response, 'tools'):
                     logger.error(f"Response from {server_name} missing tools attribute: {tools_response}")
+                    listing_failed = True
                     continue
 
                 tools = []
@@ -492,6 +497,10 @@ class ServerManager:
             except Exception as e:
                 logger.error(f"Failed to get tools from {server_name}", exc_info=True)
                 logger.debug(f"Server info: {server_info}")
+                listing_failed = True
+        if listing_failed:
+            # Don't let a partial list be cached as if it were complete
+            self.tools_version += 1
         return available_tools
 
     async def call_tool(self, tool_name: str, tool_args: dict, timeout: int = 60) -> Optional[dict]:
@@ -641,6 +650,7 @@ class ServerManager:
                 server_info = self.servers[server_name]
                 logger.debug(f"[{server_name}] Cleaning up server info: {server_info}")
                 del self.servers[server_name]
+                self.tools_version += 1
                 logger.debug(f"[{server_name}] Removed server info")
             except Exception as e:
                 logger.error(f"[{server_name}] Error removing server info", exc_info=True)
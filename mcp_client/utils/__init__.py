@@ -1,3 +1,4 @@
 from .logging_config import setup_logging
+from .retry import backoff_delay
 
-__all__ = ['setup_logging']
+__all__ = ['setup_logging', 'backoff_delay']
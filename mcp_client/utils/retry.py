@@ -0,0 +1,14 @@
+import random
+
+# Bounds for retry delays, in seconds
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 10.0
+
+def backoff_delay(previous: float = 0.0, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Get the next retry delay using decorrelated jitter
+
+    Each delay is drawn between base and three times the previous delay,
+    so concurrent clients retrying the same server spread out instead of
+    retrying in lockstep.
+    """
+    return min(cap, random.uniform(base, max(previous, base) * 3))